@@ -3,22 +3,51 @@ flac_toolkit/analyzer.py
 Comprehensive FLAC file analysis with RFC 9639 validation.
 """
 
+import functools
 import hashlib
+import queue
 import re
+import shutil
+import sqlite3
+import subprocess
+import threading
 import numpy as np
 import soundfile as sf
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Generator, Tuple, Optional
 
-from mutagen.flac import FLAC, FLACNoHeaderError
+from mutagen.flac import FLAC, FLACNoHeaderError, StreamInfo, VCFLACDict
 from mutagen.mp3 import HeaderNotFoundError
 from pathvalidate import validate_filename, ValidationError
 
-from flac_toolkit.validator import RFC9639Validator
+from flac_toolkit.constants import MD5_CACHE_FILE, MD5_CACHE_SIZE
+from flac_toolkit.validator import RFC9639Validator, ValidationResult
 
+# Strips the echoed "value='...'" part from pathvalidate error messages
+_VALIDATION_VALUE_RE = re.compile(r",?\s*value=(['\"]).*?\1")
 
-def analyze_flac_comprehensive(file_path: Path) -> Dict[str, Any]:
-    """Performs a comprehensive analysis of a FLAC file using multiple techniques."""
+# Vorbis comment fields copied into result['tags']
+_TAG_KEYS = (
+    'artist', 'album', 'title', 'genre', 'date', 'tracknumber', 'albumartist',
+    'replaygain_track_gain', 'replaygain_track_peak',
+)
+_EMPTY = ('',)
+
+# Decoded blocks buffered between the MD5 reader thread and the hasher
+_MD5_QUEUE_DEPTH = 4
+
+
+def analyze_flac_comprehensive(file_path: Path, verify_unset_md5: bool = False,
+                               use_md5_cache: bool = False) -> Dict[str, Any]:
+    """Performs a comprehensive analysis of a FLAC file using multiple techniques.
+
+    When the STREAMINFO MD5 is unset there is nothing to verify against, so the
+    full audio decode is skipped unless ``verify_unset_md5`` is True (needed
+    when the calculated MD5 is used for duplicate detection).
+
+    With ``use_md5_cache``, calculated MD5s are reused for files whose path,
+    mtime and size are unchanged since they were last hashed.
+    """
     result: Dict[str, Any] = {
         'file': str(file_path), 'status': 'INVALID', 'errors': [], 'warnings': [],
         'info': {}, 'metrics': {}, 'tags': {},
@@ -39,30 +68,39 @@ def analyze_flac_comprehensive(file_path: Path) -> Dict[str, Any]:
         result['warnings'].append(f"[{w.code}] {w.message}")
 
     try:
-        audio = FLAC(file_path)
+        info, audio_tags = _load_flac_metadata(file_path, validation_result)
         
         # Formatted info for display
         result['info'] = {
-            'duration': f"{audio.info.length:.2f}s", 
-            'sample_rate': audio.info.sample_rate,
-            'channels': audio.info.channels, 
-            'bits_per_sample': audio.info.bits_per_sample,
-            'bitrate': f"{audio.info.bitrate // 1000} kbps"
+            'duration': f"{info.length:.2f}s", 
+            'sample_rate': info.sample_rate,
+            'channels': info.channels, 
+            'bits_per_sample': info.bits_per_sample,
+            'bitrate': f"{info.bitrate // 1000} kbps"
         }
 
         # Raw metrics for DataFrame/Reporting
-        md5_header = format(audio.info.md5_signature, '032x') if audio.info.md5_signature else None
+        md5_header = format(info.md5_signature, '032x') if info.md5_signature else None
         
         # Calculate MD5 (Pure Python)
-        md5_calculated, md5_error = _calculate_audio_md5(file_path, audio.info.bits_per_sample)
+        md5_calculated, md5_error = None, None
+        if md5_header or verify_unset_md5:
+            if use_md5_cache:
+                # Keyed on the validator's fstat of its open handle, no second stat()
+                md5_calculated, md5_error = _cached_audio_md5(
+                    str(file_path), validation_result.file_mtime_ns,
+                    validation_result.file_size, info.bits_per_sample
+                )
+            else:
+                md5_calculated, md5_error = _calculate_audio_md5(file_path, info.bits_per_sample)
         
         result['metrics'] = {
-            'duration_seconds': audio.info.length,
-            'sample_rate': audio.info.sample_rate,
-            'channels': audio.info.channels,
-            'bits_per_sample': audio.info.bits_per_sample,
-            'bitrate_kbps': int(audio.info.bitrate / 1000) if audio.info.bitrate else 0,
-            'filesize_mb': round(file_path.stat().st_size / (1024 * 1024), 2),
+            'duration_seconds': info.length,
+            'sample_rate': info.sample_rate,
+            'channels': info.channels,
+            'bits_per_sample': info.bits_per_sample,
+            'bitrate_kbps': int(info.bitrate / 1000) if info.bitrate else 0,
+            'filesize_mb': round(validation_result.file_size / (1024 * 1024), 2),
             'md5_header': md5_header,
             'md5_calculated': md5_calculated
         }
@@ -73,18 +111,8 @@ def analyze_flac_comprehensive(file_path: Path) -> Dict[str, Any]:
             result['errors'].append(f"MD5 Mismatch: Header={md5_header}, Calculated={md5_calculated}")
 
         # Metadata tags
-        tags: Any = audio.tags if audio.tags else {}
-        result['tags'] = {
-            'artist': (tags.get('artist') or [''])[0],
-            'album': (tags.get('album') or [''])[0],
-            'title': (tags.get('title') or [''])[0],
-            'genre': (tags.get('genre') or [''])[0],
-            'date': (tags.get('date') or [''])[0],
-            'tracknumber': (tags.get('tracknumber') or [''])[0],
-            'albumartist': (tags.get('albumartist') or [''])[0],
-            'replaygain_track_gain': (tags.get('replaygain_track_gain') or [''])[0],
-            'replaygain_track_peak': (tags.get('replaygain_track_peak') or [''])[0],
-        }
+        tags: Any = audio_tags if audio_tags else {}
+        result['tags'] = {k: (tags.get(k) or _EMPTY)[0] for k in _TAG_KEYS}
 
         result['warnings'].extend(_analyze_filename_compatibility(file_path.name))
 
@@ -107,6 +135,29 @@ def analyze_flac_comprehensive(file_path: Path) -> Dict[str, Any]:
     return result
 
 
+def _load_flac_metadata(file_path: Path, validation_result: ValidationResult) -> Tuple[Any, Any]:
+    """
+    Returns mutagen (StreamInfo, VCFLACDict | None) for the file.
+
+    The validator has already read every metadata block, so for files it
+    accepted, STREAMINFO and VORBIS_COMMENT are decoded from those bytes
+    instead of re-parsing the file. Anything else goes through a full mutagen
+    load, which keeps its error reporting for broken files.
+    """
+    if validation_result.is_valid and validation_result.streaminfo:
+        try:
+            blocks = validation_result.metadata_blocks
+            info = StreamInfo(blocks[0].data)  # STREAMINFO is first in a valid file
+            audio_size = validation_result.file_size - validation_result.audio_offset
+            info.bitrate = int(audio_size * 8 / info.length) if info.length else 0
+            vorbis = next((b for b in blocks if b.block_type == RFC9639Validator.BLOCK_VORBIS_COMMENT), None)
+            return info, (VCFLACDict(vorbis.data) if vorbis else None)
+        except Exception:
+            pass
+    audio = FLAC(file_path)
+    return audio.info, audio.tags
+
+
 def _analyze_filename_compatibility(filename: str) -> List[str]:
     """Analyzes filename for cross-platform compatibility."""
     warnings: List[str] = []
@@ -114,57 +165,91 @@ def _analyze_filename_compatibility(filename: str) -> List[str]:
         validate_filename(filename, platform="universal")
     except ValidationError as e:
         msg = str(e)
-        msg = re.sub(r",?\s*value=(['\"]).*?\1", "", msg)
+        msg = _VALIDATION_VALUE_RE.sub("", msg)
         warnings.append(f"Filename Warning: {msg}")
     return warnings
 
 
+@functools.lru_cache(maxsize=MD5_CACHE_SIZE)
+def _cached_audio_md5(path: str, mtime_ns: int, size: int, bits_per_sample: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    _calculate_audio_md5 memoized on (path, mtime, size), in memory and in the
+    on-disk cache at MD5_CACHE_FILE. Only successful hashes are persisted.
+    """
+    key = (path, mtime_ns, size, bits_per_sample)
+    md5_hex = _md5_cache_get(key)
+    if md5_hex:
+        return md5_hex, None
+    md5_hex, error = _calculate_audio_md5(Path(path), bits_per_sample)
+    if md5_hex:
+        _md5_cache_put(key, md5_hex)
+    return md5_hex, error
+
+
+@functools.lru_cache(maxsize=1)
+def _md5_cache_db() -> Optional[sqlite3.Connection]:
+    """Opens (once per process) the persistent MD5 cache, or returns None if unavailable."""
+    try:
+        MD5_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(MD5_CACHE_FILE, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS audio_md5 ('
+            'path TEXT, mtime_ns INTEGER, size INTEGER, bits INTEGER, md5 TEXT, '
+            'PRIMARY KEY (path, mtime_ns, size, bits))'
+        )
+        return conn
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def _md5_cache_get(key: Tuple[str, int, int, int]) -> Optional[str]:
+    conn = _md5_cache_db()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            'SELECT md5 FROM audio_md5 WHERE path=? AND mtime_ns=? AND size=? AND bits=?', key
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _md5_cache_put(key: Tuple[str, int, int, int], md5_hex: str) -> None:
+    conn = _md5_cache_db()
+    if conn is None:
+        return
+    try:
+        conn.execute('INSERT OR REPLACE INTO audio_md5 VALUES (?, ?, ?, ?, ?)', (*key, md5_hex))
+    except sqlite3.Error:
+        pass
+
+
 def _calculate_audio_md5(file_path: Path, bits_per_sample: int) -> Tuple[Optional[str], Optional[str]]:
     """
     Calculates the MD5 of the raw audio samples using soundfile and numpy.
     FLAC MD5 is computed over signed little-endian interleaved samples.
     Supports all standard bit depths: 8, 16, 20, 24, 32.
     Returns (md5_hex, error_message).
-    """
-    md5 = hashlib.md5()
-    block_size = 65536
-    bytes_per_sample = (bits_per_sample + 7) // 8  # 1, 2, 3, 3, 4
 
-    try:
-        if bits_per_sample <= 16:
-            # 8-bit and 16-bit: soundfile reads as int16 natively
-            dtype = 'int16'
-            with sf.SoundFile(file_path) as f:
-                for block in f.blocks(blocksize=block_size, dtype=dtype, always_2d=True):
-                    if bits_per_sample == 8:
-                        # FLAC 8-bit is signed: soundfile int16 scaled by 256, shift back
-                        samples_8 = (block >> 8).astype(np.int8)
-                        md5.update(samples_8.tobytes())
-                    else:
-                        md5.update(block.tobytes())
-
-        elif bits_per_sample <= 24:
-            # 20-bit and 24-bit: soundfile reads as int32 (left-shifted by 8 bits)
-            dtype = 'int32'
-            shift = 32 - bits_per_sample  # 12 for 20-bit, 8 for 24-bit
-            with sf.SoundFile(file_path) as f:
-                for block in f.blocks(blocksize=block_size, dtype=dtype, always_2d=True):
-                    raw = block.astype(np.int32) >> shift
-                    # Pack to 3 bytes LE per sample (FLAC packs 20-bit and 24-bit in 3 bytes)
-                    bytes_view = raw.view(np.uint8).reshape(-1, 4)
-                    packed = bytes_view[:, :3].tobytes()
-                    md5.update(packed)
-
-        elif bits_per_sample == 32:
-            # 32-bit: soundfile reads as int32
-            dtype = 'int32'
-            with sf.SoundFile(file_path) as f:
-                for block in f.blocks(blocksize=block_size, dtype=dtype, always_2d=True):
-                    md5.update(block.tobytes())
+    Blocks are fed to hashlib through the buffer protocol (no ``tobytes()``
+    copy); soundfile yields C-contiguous arrays, which is what hashlib requires.
+    Mono streams come back 1-D and multi-channel ones as interleaved (frames,
+    channels) arrays; both have the byte layout FLAC hashes.
+    """
+    if bits_per_sample not in (8, 16, 20, 24, 32):
+        return None, f"MD5 calculation not supported for {bits_per_sample}-bit depth."
 
-        else:
-            return None, f"MD5 calculation not supported for {bits_per_sample}-bit depth."
+    if bits_per_sample in (20, 24) and _flac_decoder_available():
+        # The flac decoder emits packed 3-byte samples directly; prefer it when installed
+        md5_hex = _calculate_audio_md5_flac(file_path)
+        if md5_hex:
+            return md5_hex, None
 
+    md5 = hashlib.md5(usedforsecurity=False)
+    try:
+        _md5_update_pipelined(md5, _iter_md5_blocks(file_path, bits_per_sample))
         return md5.hexdigest(), None
 
     except Exception as e:
@@ -174,6 +259,115 @@ def _calculate_audio_md5(file_path: Path, bits_per_sample: int) -> Tuple[Optiona
         return None, error_msg
 
 
+def _iter_md5_blocks(file_path: Path, bits_per_sample: int) -> Generator[Any, None, None]:
+    """Yields the decoded audio as buffers in the byte layout FLAC hashes."""
+    block_size = 262144
+
+    if bits_per_sample <= 16:
+        # 8-bit and 16-bit: soundfile reads as int16 natively
+        dtype = 'int16'
+        with sf.SoundFile(file_path) as f:
+            for block in f.blocks(blocksize=block_size, dtype=dtype):
+                if bits_per_sample == 8:
+                    # FLAC 8-bit is signed: soundfile int16 scaled by 256, shift back
+                    yield (block >> 8).astype(np.int8)
+                else:
+                    yield block
+
+    elif bits_per_sample <= 24:
+        # 20-bit and 24-bit: soundfile reads as int32 (left-shifted by 8 bits)
+        dtype = 'int32'
+        shift = 32 - bits_per_sample  # 12 for 20-bit, 8 for 24-bit
+        with sf.SoundFile(file_path) as f:
+            # Packed 3-byte samples go to a ring of scratch buffers reused across blocks. It must
+            # outlast the hashing queue: queued blocks + the one being hashed + the one being filled
+            ring = [np.empty(block_size * f.channels * 3, dtype=np.uint8)
+                    for _ in range(_MD5_QUEUE_DEPTH + 2)]
+            for i, block in enumerate(f.blocks(blocksize=block_size, dtype=dtype)):
+                np.right_shift(block, shift, out=block)
+                # Pack to 3 bytes LE per sample (FLAC packs 20-bit and 24-bit in 3 bytes):
+                # three 1-D strided copies vectorize far better than a (n, 4)[:, :3] gather
+                u8 = block.view(np.uint8).reshape(-1)
+                packed = ring[i % len(ring)][:block.size * 3]
+                packed[0::3] = u8[0::4]
+                packed[1::3] = u8[1::4]
+                packed[2::3] = u8[2::4]
+                yield packed
+
+    else:
+        # 32-bit: soundfile reads as int32
+        dtype = 'int32'
+        with sf.SoundFile(file_path) as f:
+            yield from f.blocks(blocksize=block_size, dtype=dtype)
+
+
+def _md5_update_pipelined(md5: Any, blocks: Generator[Any, None, None]) -> None:
+    """
+    Feeds blocks to md5 while a reader thread decodes the next ones.
+    libsndfile (called through cffi) and hashlib both release the GIL, so
+    decoding and hashing overlap on separate cores. Reader errors are
+    re-raised in the calling thread; if hashing fails instead, the reader is
+    stopped and the generator closed (releasing its file) before returning.
+    """
+    q: queue.Queue = queue.Queue(maxsize=_MD5_QUEUE_DEPTH)
+    done = object()
+    stop = threading.Event()
+
+    def read() -> None:
+        try:
+            for block in blocks:
+                if stop.is_set():
+                    break
+                q.put(block)
+        except BaseException as e:
+            q.put(e)
+        else:
+            q.put(done)
+        finally:
+            blocks.close()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        while (item := q.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            md5.update(item)
+    finally:
+        stop.set()
+        # Drain so a reader blocked on a full queue can reach the stop check
+        while reader.is_alive():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                reader.join(0.01)
+
+
+@functools.lru_cache(maxsize=None)
+def _flac_decoder_available() -> bool:
+    """Whether the flac command-line tool is on PATH, looked up once per process."""
+    return shutil.which('flac') is not None
+
+
+def _calculate_audio_md5_flac(file_path: Path) -> Optional[str]:
+    """
+    Calculates the audio MD5 by piping raw signed little-endian PCM from the
+    flac decoder into hashlib, with no per-sample work in Python.
+    Returns None if decoding fails (including on an MD5 mismatch, which flac
+    reports as an error), so the caller can fall back to soundfile.
+    """
+    cmd = ['flac', '-d', '-s', '--stdout', '--force-raw-format',
+           '--endian=little', '--sign=signed', str(file_path)]
+    md5 = hashlib.md5(usedforsecurity=False)
+    try:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+            while chunk := proc.stdout.read(1 << 20):
+                md5.update(chunk)
+    except OSError:
+        return None
+    return md5.hexdigest() if proc.returncode == 0 else None
+
+
 def _generate_repair_suggestions(result: Dict[str, Any]) -> List[Dict[str, str]]:
     """Generate repair suggestions based on analysis result."""
     suggestions: List[Dict[str, str]] = []
@@ -12,8 +12,9 @@ def validate(args):
     """
     Validate FLAC files against RFC 9639 specification and generate HTML report.
     """
+    import itertools
+    from collections import Counter
     from pathlib import Path
-    from collections import defaultdict
     from flac_toolkit.core import find_flac_files, run_parallel
     from flac_toolkit.analyzer import analyze_flac_comprehensive
     from flac_toolkit.dataframe import create_dataframe, generate_html_report
@@ -29,17 +30,26 @@ def validate(args):
         safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in target_name)
         output_html = f'flac_validation_report_{safe_name}.html'
 
-    files = list(find_flac_files(target_paths))
-    if not files:
+    # Stream the walk into the workers; only peek far enough to know it is not empty
+    files = find_flac_files(target_paths)
+    first = next(files, None)
+    if first is None:
         logging.warning("No FLAC files found.")
         return
+    files = itertools.chain([first], files)
 
-    results = run_parallel(files, analyze_flac_comprehensive, args.workers, "Validating files...")
+    # Duplicate detection relies on calculated MD5s, so files with an unset header MD5 must be decoded too
+    verify_unset_md5 = args.verify_md5 or args.check_duplicates
+    results = run_parallel(
+        files, analyze_flac_comprehensive, args.workers, "Validating files...",
+        worker_args=(verify_unset_md5, args.md5_cache)
+    )
 
     # Print console summary
     total = len(results)
-    valid_count = sum(1 for r in results if r['status'] == 'VALID')
-    warn_count = sum(1 for r in results if r['status'] == 'VALID (with warnings)')
+    status_counts = Counter(r['status'] for r in results)
+    valid_count = status_counts['VALID']
+    warn_count = status_counts['VALID (with warnings)']
     invalid_count = total - valid_count - warn_count
     logging.info(f"\n{'='*70}\nFINAL SUMMARY\n{'='*70}")
     logging.info(f"Total files scanned: {total}")
@@ -54,13 +64,25 @@ def validate(args):
         logging.info("\n[bold cyan]Checking for duplicates...[/bold cyan]")
         from flac_toolkit.dedupe import build_duplicate_groups
 
-        audio_md5_map: dict = defaultdict(list)
-        for r in results:
+        # Singleton MD5s (most files) only ever sit in first_seen; a group list is made on the
+        # second hit, remembering where its first file was so groups keep first-seen order
+        first_seen: dict = {}
+        groups: dict = {}
+        for i, r in enumerate(results):
             md5 = (r.get('metrics') or {}).get('md5_calculated')
-            if md5:
-                audio_md5_map[md5].append(Path(r['file']))
-
-        duplicate_groups = build_duplicate_groups(audio_md5_map)
+            if not md5:
+                continue
+            path = Path(r['file'])
+            if md5 in groups:
+                groups[md5][1].append(path)
+            elif md5 in first_seen:
+                first_i, first_path = first_seen.pop(md5)
+                groups[md5] = (first_i, [first_path, path])
+            else:
+                first_seen[md5] = (i, path)
+        audio_md5_map = {md5: files for md5, (_, files) in sorted(groups.items(), key=lambda kv: kv[1][0])}
+
+        duplicate_groups = build_duplicate_groups(audio_md5_map, args.workers)
 
         if duplicate_groups:
             total_dup_files = sum(len(g.files) for g in duplicate_groups)
@@ -132,9 +154,10 @@ def replaygain(args):
     """
     from pathlib import Path
     from collections import defaultdict
-    from mutagen.flac import FLAC
+    from concurrent.futures import ThreadPoolExecutor
+    from flac_toolkit.constants import ALBUM_TAG_READ_THREADS
     from flac_toolkit.core import find_flac_files
-    from flac_toolkit.replaygain import process_album
+    from flac_toolkit.replaygain import measure_tracks, process_album, read_album_tag
 
     assume_album = args.assume_album
     target_paths = [Path(p) for p in args.target_paths]
@@ -152,19 +175,26 @@ def replaygain(args):
         albums["<Assumed Album>"] = files
     else:
         logging.info("Grouping files by album metadata...")
-        for file_path in files:
-            try:
-                audio = FLAC(file_path)
-                album_tag = (audio["album"][0] if "album" in audio else "_NO_ALBUM_TAG_")
-                albums[album_tag].append(file_path)
-            except Exception as e:
-                logging.warning(f"Could not read metadata from {file_path.name}: {e}")
+        # Tag reads are I/O-bound: overlap them in threads, then consume in input order
+        with ThreadPoolExecutor(max_workers=ALBUM_TAG_READ_THREADS) as executor:
+            futures = [executor.submit(read_album_tag, f) for f in files]
+            for file_path, future in zip(files, futures):
+                try:
+                    album_tag = future.result()
+                    if album_tag is None:
+                        album_tag = "_NO_ALBUM_TAG_"
+                    albums[album_tag].append(file_path)
+                except Exception as e:
+                    logging.warning(f"Could not read metadata from {file_path.name}: {e}")
 
     album_items = list(albums.items())
 
+    # One worker pool measures every track; albums are then gained from the results
+    measurements = measure_tracks([f for _, album_files in album_items for f in album_files], args.workers)
+
     for album_name, album_files in album_items:
         logging.info(f"\n--- Processing Album: [bold cyan]{album_name}[/bold cyan] ({len(album_files)} tracks) ---")
-        process_album(album_files)
+        process_album(album_files, measurements)
 
 
 def report(args):
@@ -209,6 +239,8 @@ def main():
     validate_parser.add_argument('-w', '--workers', type=int, default=None, help='Number of parallel workers.')
     validate_parser.add_argument('-o', '--output', type=str, default='flac_validation_report.html', help='Path to the output HTML report.')
     validate_parser.add_argument('--check-duplicates', action='store_true', help='Also detect audio duplicates and include a Duplicates tab in the HTML report. Reuses MD5s already computed during validation (no extra I/O).')
+    validate_parser.add_argument('--verify-md5', action='store_true', help='Decode and hash the audio even when the STREAMINFO MD5 is unset (skipped by default since there is nothing to compare against).')
+    validate_parser.add_argument('--md5-cache', action='store_true', help='Reuse audio MD5s calculated by previous runs for files whose path, size and modification time are unchanged.')
 
     # Repair command
     repair_parser = subparsers.add_parser('repair', help='Repair files based on validation. Use --force to re-encode all.')
@@ -221,6 +253,7 @@ def main():
     replaygain_parser = subparsers.add_parser('replaygain', help='Calculate and apply ReplayGain tags.')
     replaygain_parser.add_argument('target_paths', nargs='+', help='One or more files or directories to process.')
     replaygain_parser.add_argument('--assume-album', action='store_true', help='Treat all files as one album.')
+    replaygain_parser.add_argument('-w', '--workers', type=int, default=None, help='Number of parallel workers used to analyze the tracks.')
 
     # Report command (regenerate from JSON)
     report_parser = subparsers.add_parser('report', help='Regenerate an HTML report from a previously saved JSON data file (no re-scan required).')
@@ -1,7 +1,34 @@
 """FLAC Toolkit project constants."""
 
+from pathlib import Path
+
+# Progress display (redraws per second; verbose runs use rich's default of 10)
+PROGRESS_REFRESH_PER_SECOND = 2
+
+# Files per worker task when the file list is streamed from the directory walk
+STREAM_BATCH_SIZE = 16
+
+# Worker batches submitted ahead per worker; bounds queued pickled batches and pending results
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+
+# Bytes read at once when walking metadata block headers
+METADATA_READ_SIZE = 64 * 1024
+
+# Threads listing directories ahead of the file discovery walk
+WALK_THREADS = 8
+
 # ReplayGain
 TARGET_LOUDNESS_LUFS = -18.0
+ALBUM_TAG_READ_THREADS = 32
+TAG_WRITE_THREADS = 8
+REPLAYGAIN_READ_FRAMES = 1 << 16  # frames decoded per read when measuring loudness
+
+# Validation
+MD5_CACHE_FILE = Path.home() / ".cache" / "flac_toolkit" / "md5.db"
+MD5_CACHE_SIZE = 4096
+DEDUPE_TAG_READ_THREADS = 32
 
 # Repair
 QUARANTINE_FOLDER_NAME = "_flac_toolkit_quarantine"
+FILENAME_CACHE_SIZE = 1 << 16
+TAG_PADDING = 8192  # bytes of PADDING left when tags outgrow the existing block
@@ -1,12 +1,16 @@
 import os
 import sys
+import itertools
 import logging
+import multiprocessing
 import platform
+import struct
 from pathlib import Path
-from typing import Iterator, List, Callable, Any
+from typing import BinaryIO, Iterable, Iterator, List, Callable, Any, Sized, Tuple
 from contextlib import contextmanager
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from flac_toolkit.constants import QUARANTINE_FOLDER_NAME
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from flac_toolkit.constants import BATCHES_IN_FLIGHT_PER_WORKER, METADATA_READ_SIZE, PROGRESS_REFRESH_PER_SECOND, QUARANTINE_FOLDER_NAME, STREAM_BATCH_SIZE, WALK_THREADS
+from flac_toolkit.validator import BLOCK_HEADER, RFC9639Validator
 from rich.logging import RichHandler
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn, MofNCompleteColumn
 from rich.console import Console
@@ -49,9 +53,41 @@ def _cap_workers(workers: int | None) -> int | None:
     return workers
 
 
+def _worker_init(verbose: bool, quiet: bool) -> None:
+    """Pool initializer: configure logging and import the decoding stack once per worker.
+
+    Spawned workers (Windows, macOS) do not inherit the parent's logging setup.
+    """
+    setup_logging(verbose, quiet)
+    import numpy, soundfile, mutagen.flac  # noqa: F401
+
+
+def _mp_context():
+    """Pool start method: forkserver where available, the platform default (spawn) otherwise.
+
+    The parent runs rich's refresh thread while workers start, and fork() from
+    a multi-threaded process can deadlock. The fork server imports the
+    worker modules once; each worker is then forked from it already loaded.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['flac_toolkit.analyzer', 'flac_toolkit.repair'])
+    return ctx
+
+
+def _run_batch(worker_fn: Callable[..., Any], batch: List[Path], worker_args: tuple) -> List[Any]:
+    """Run worker_fn over a batch of files inside one worker process."""
+    return [worker_fn(f, *worker_args) for f in batch]
+
+
 @contextmanager
 def flac_progress(description: str):
-    """Reusable Rich progress bar context manager."""
+    """Reusable Rich progress bar context manager.
+
+    Redraws are throttled to PROGRESS_REFRESH_PER_SECOND unless debug logging is on.
+    """
+    verbose = logging.getLogger().getEffectiveLevel() <= logging.DEBUG
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -60,13 +96,14 @@ def flac_progress(description: str):
         TaskProgressColumn(),
         TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
         TimeRemainingColumn(),
-        expand=True
+        expand=True,
+        refresh_per_second=10 if verbose else PROGRESS_REFRESH_PER_SECOND
     ) as progress:
         yield progress, description
 
 
 def run_parallel(
-    files: List[Path],
+    files: Iterable[Path],
     worker_fn: Callable[..., Any],
     workers: int | None,
     description: str,
@@ -77,36 +114,76 @@ def run_parallel(
 
     Parameters
     ----------
-    files : list of paths
-    worker_fn : callable(file_path, *worker_args) -> result
+    files : list of paths, or an iterator of paths (e.g. find_flac_files); an
+        iterator is consumed lazily, so workers start before the walk ends
+    worker_fn : callable(file_path, *worker_args) -> result (must be picklable)
     workers : number of workers (None = cpu_count, 1 = sequential)
     description : progress bar label
     worker_args : extra positional args passed after file_path
     collect_results : if False, results of futures are discarded (repair mode)
+
+    Results are returned in the order of `files`.
     """
     workers = _cap_workers(workers)
     results: List[Any] = []
+    total = len(files) if isinstance(files, Sized) else None
 
     with flac_progress(description) as (progress, _desc):
         if workers is not None and workers == 1:
             logging.info("Running in [bold]sequential[/bold] mode (1 worker).")
-            task = progress.add_task(description, total=len(files))
+            task = progress.add_task(description, total=total)
+            done = 0
             for f in files:
                 res = worker_fn(f, *worker_args)
                 if collect_results:
                     results.append(res)
-                progress.advance(task)
+                done += 1
+                progress.update(task, completed=done, total=total or done)
         else:
             effective_workers = workers if workers else os.cpu_count()
             logging.info(f"Running in [bold]parallel[/bold] mode ({effective_workers} workers).")
-            with ProcessPoolExecutor(max_workers=workers) as executor:
-                futures = [executor.submit(worker_fn, f, *worker_args) for f in files]
-                task = progress.add_task(description, total=len(files))
-                for future in as_completed(futures):
-                    res = future.result()
-                    if collect_results:
-                        results.append(res)
-                    progress.advance(task)
+            # Submit files in batches (~4 per worker when the count is known) to amortize pickling and IPC per task
+            if total is None:
+                batch_size = STREAM_BATCH_SIZE
+            else:
+                batch_size = max(1, -(-total // (effective_workers * 4)))
+            log_level = logging.getLogger().getEffectiveLevel()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_mp_context(),
+                initializer=_worker_init,
+                initargs=(log_level <= logging.DEBUG, log_level >= logging.ERROR),
+            ) as executor:
+                task = progress.add_task(description, total=total)
+                # Only a bounded window of batches is in flight; a new one is submitted as each completes
+                max_in_flight = effective_workers * BATCHES_IN_FLIGHT_PER_WORKER
+                pending = {}  # future -> (batch index, batch length)
+                batch_results: List[List[Any]] = []
+                submitted = 0
+                it = iter(files)
+                exhausted = False
+                while True:
+                    while not exhausted and len(pending) < max_in_flight:
+                        batch = list(itertools.islice(it, batch_size))
+                        if not batch:
+                            exhausted = True
+                            break
+                        pending[executor.submit(_run_batch, worker_fn, batch, worker_args)] = (len(batch_results), len(batch))
+                        batch_results.append([])
+                        submitted += len(batch)
+                        if total is None:
+                            progress.update(task, total=submitted)
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, length = pending.pop(future)
+                        res = future.result()
+                        if collect_results:
+                            batch_results[index] = res
+                        progress.advance(task, length)
+                # Batches complete out of order; return the results in input order
+                results = [res for batch in batch_results for res in batch]
 
     return results
 
@@ -119,6 +196,131 @@ def find_flac_files(target_paths: List[Path]) -> Iterator[Path]:
         if path.is_file() and path.suffix.lower() == '.flac':
             yield path
         elif path.is_dir():
-            for p in path.rglob('*.flac'):
-                if QUARANTINE_FOLDER_NAME not in p.parts:
-                    yield p
+            yield from _walk_flac_files(path)
+
+
+def _walk_flac_files(root: Path) -> Iterator[Path]:
+    """Depth-first os.scandir walk yielding *.flac files, pruning quarantine folders.
+
+    Like rglob, symlinked directories are not followed. Subdirectories are
+    listed ahead of time on WALK_THREADS threads, so the directory reads of a
+    cold tree overlap; files are still yielded in the order of a sequential walk.
+    """
+    executor = ThreadPoolExecutor(max_workers=WALK_THREADS)
+    try:
+        stack = [executor.submit(_scan_dir, str(root))]
+        while stack:
+            try:
+                subdirs, flac_files = stack.pop().result()
+            except OSError as e:
+                logging.warning(f"Cannot read directory: {e}")
+                continue
+            for file_path in flac_files:
+                yield Path(file_path)
+            stack.extend(executor.submit(_scan_dir, subdir) for subdir in subdirs)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_dir(directory: str) -> Tuple[List[str], List[str]]:
+    """Lists the subdirectories (minus quarantine folders) and *.flac files of a directory."""
+    subdirs, flac_files = [], []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name != QUARANTINE_FOLDER_NAME:
+                    subdirs.append(entry.path)
+            elif entry.name.lower().endswith('.flac'):
+                flac_files.append(entry.path)
+    return subdirs, flac_files
+
+
+# Little-endian length prefix of the VORBIS_COMMENT vendor string, comment count and comments
+_VORBIS_LENGTH = struct.Struct('<I')
+
+
+def read_metadata_block(f: BinaryIO, block_type: int) -> bytes | None:
+    """
+    Returns the body of the first metadata block of `block_type`, or None if there is none.
+
+    `f` must be positioned just after the 'fLaC' signature. The block headers
+    are parsed from METADATA_READ_SIZE-byte reads instead of a read/seek pair
+    per block; blocks before the wanted one (e.g. a PICTURE) are skipped without
+    being read unless they fit in the same read. Block lengths are checked
+    against the file size, so a corrupt header cannot send the walk past the end.
+    """
+    file_size = os.fstat(f.fileno()).st_size
+    offset = f.tell()  # file offset of buf[0]
+    buf = f.read(METADATA_READ_SIZE)
+    pos = 0
+    while True:
+        if pos + 4 > len(buf):
+            if offset + pos + 4 > file_size:
+                raise ValueError("Unexpected end of file reading metadata block header")
+            offset += pos
+            f.seek(offset)
+            buf = f.read(METADATA_READ_SIZE)
+            pos = 0
+            # The file may have shrunk since the fstat; never retry a short read forever
+            if len(buf) < 4:
+                raise ValueError("Unexpected end of file reading metadata block header")
+            continue
+        fields = BLOCK_HEADER.unpack_from(buf, pos)[0]
+        length = fields & 0xFFFFFF
+        start = pos + 4
+        if offset + start + length > file_size:
+            raise ValueError("Metadata block extends past the end of the file")
+        if (fields >> 24) & 0x7F == block_type:
+            if start + length <= len(buf):
+                return buf[start:start + length]
+            f.seek(offset + start)
+            return f.read(length)
+        if fields >> 31:
+            return None
+        pos = start + length
+
+
+def read_vorbis_comments(file_path: Path, keys: Tuple[str, ...]) -> Tuple[str | None, ...]:
+    """
+    Returns the first value of each Vorbis comment field in `keys` (lowercase
+    names), None for the fields the file does not have.
+
+    Only the metadata block headers are walked (see read_metadata_block) and
+    only the wanted comments of VORBIS_COMMENT are decoded. Files without a
+    leading 'fLaC' signature (e.g. with an ID3v2 prefix) are handed to mutagen.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(4) != b'fLaC':
+            from mutagen.flac import FLAC
+            audio = FLAC(file_path)
+            return tuple(audio[k][0] if k in audio else None for k in keys)
+        data = read_metadata_block(f, RFC9639Validator.BLOCK_VORBIS_COMMENT)
+    values: dict = dict.fromkeys(keys)
+    if data is not None:
+        _find_vorbis_comments(data, values)
+    return tuple(values.values())
+
+
+def _find_vorbis_comments(data: bytes, values: dict) -> None:
+    """Fills `values` (field name -> None) from the comments of a raw VORBIS_COMMENT block."""
+    if len(data) < 4:
+        return
+    pos = 4 + _VORBIS_LENGTH.unpack_from(data, 0)[0]  # skip the vendor string
+    if pos + 4 > len(data):
+        return
+    comment_count = _VORBIS_LENGTH.unpack_from(data, pos)[0]
+    pos += 4
+    missing = len(values)
+    for _ in range(comment_count):
+        if pos + 4 > len(data):
+            break
+        comment_len = _VORBIS_LENGTH.unpack_from(data, pos)[0]
+        pos += 4
+        name, sep, value = data[pos:pos + comment_len].partition(b'=')
+        pos += comment_len
+        name = name.decode('ascii', errors='replace').lower()
+        if sep and name in values and values[name] is None:
+            values[name] = value.decode('utf-8', errors='replace')
+            missing -= 1
+            if not missing:
+                break
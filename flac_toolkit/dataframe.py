@@ -3,57 +3,126 @@ flac_toolkit/dataframe.py
 DataFrame creation and HTML report generation with RFC 9639 validation details.
 """
 
+import base64
 import logging
 import json
+import os
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
+import numpy as np
 import pandas as pd
 
 from flac_toolkit._version import __version__
+from flac_toolkit.constants import DEDUPE_TAG_READ_THREADS
+from flac_toolkit.core import read_vorbis_comments
+
+# Integer-valued metrics, stored as nullable Int32 in the report DataFrame
+_INT_METRIC_COLUMNS = frozenset({'sample_rate', 'channels', 'bits_per_sample', 'bitrate_kbps'})
+
+# Sort rank of each status in the report (unknown statuses sort last, as 99)
+_STATUS_ORDER_MAP = {'INVALID': 0, 'VALID (with warnings)': 1, 'VALID': 2}
+
+# Tags shown for each file of the Duplicates tab
+_DEDUPE_TAG_KEYS = ('artist', 'album', 'title')
+
+# Fields of the Duplicates tab rows, listed once in its 'split' payload
+_DEDUPE_COLUMNS = (
+    'group', 'filename', 'filepath', 'folder', 'foldername', 'folderuri',
+    'type', 'md5', 'artist', 'album', 'title', 'size',
+)
+
+# Rows serialized per to_json call when writing the report's table payload
+_JSON_CHUNK_ROWS = 10_000
+
+# Reports with at least this many rows ship their table payload gzipped + base64
+_GZIP_MIN_ROWS = 1000
 
 
 def create_dataframe(results: List[Dict[str, Any]]) -> pd.DataFrame:
     """
     Generates a pandas DataFrame from a list of analysis results.
     Data is kept clean (no HTML) for Tabulator.js virtualization.
-    """
-    data = []
-    for res in results:
-        path_obj = Path(res['file'])
-
-        status_order_map = {'INVALID': 0, 'VALID (with warnings)': 1, 'VALID': 2}
-
-        row = {
-            'file': path_obj.name,
-            'file_path': str(path_obj),
-            'folder': path_obj.parent.name,
-            'folder_path': str(path_obj.parent),
-            'status': res['status'],
-            'status_order': status_order_map.get(res['status'], 99),
-            'errors': '\n'.join(res['errors']),
-            'warnings': '\n'.join(res['warnings']),
-            'rfc9639_json': json.dumps(res.get('rfc9639', {}), ensure_ascii=False),
-        }
 
-        # Add metrics
-        if 'metrics' in res:
-            metrics = res['metrics'].copy()
-            # Format duration to MM:SS
-            if 'duration_seconds' in metrics:
-                d_sec = metrics['duration_seconds']
-                metrics['duration'] = f"{int(d_sec // 60):02d}:{int(d_sec % 60):02d}"
-                del metrics['duration_seconds']
-            row.update(metrics)
+    Columns are built with vectorized Series operations rather than one
+    Python dict per row; metrics and tags are expanded after the base columns.
 
-        # Add tags
-        if 'tags' in res:
-            row.update(res['tags'])
+    'status' is categorical, 'status_order' int8 and the integer metrics are
+    nullable Int32: convert with ``astype(object)`` before filling them with
+    values outside those dtypes (e.g. ``fillna('')``).
+    """
+    if not results:
+        return pd.DataFrame()
+
+    base = pd.DataFrame.from_records(results, columns=['file', 'status', 'errors', 'warnings'])
+    file_path = base['file'].astype(str)
+
+    # Same parent/name split as pathlib for normalized paths, done on the whole column
+    parts = file_path.str.rpartition(os.sep)
+    folder_path = parts[0].where(parts[0] != '', parts[1].replace('', '.'))  # '/x' -> '/', 'x' -> '.'
+    folder = folder_path.str.rpartition(os.sep)[2].mask(folder_path == '.', '')
+    # Rank the few distinct statuses once; the trailing 99 is picked by code -1 (no status)
+    status = base['status'].astype('category')
+    _status_get = _STATUS_ORDER_MAP.get
+    status_ranks = np.array([_status_get(c, 99) for c in status.cat.categories] + [99], dtype='int8')
+
+    df = pd.DataFrame({
+        'file': parts[2],
+        'file_path': file_path,
+        'folder': folder,
+        'folder_path': folder_path,
+        'status': status,
+        'status_order': status_ranks[status.cat.codes.to_numpy()],
+        'errors': base['errors'].str.join('\n'),
+        'warnings': base['warnings'].str.join('\n'),
+        'rfc9639_json': [json.dumps(res.get('rfc9639', {}), ensure_ascii=False) for res in results],
+    })
+
+    # Add metrics
+    metrics = pd.DataFrame.from_records([res.get('metrics') or {} for res in results])
+    for col in _INT_METRIC_COLUMNS.intersection(metrics.columns):
+        # Nullable ints: rows without metrics no longer turn the column into float64
+        metrics[col] = metrics[col].astype('Int32')
+    if 'duration_seconds' in metrics.columns:
+        # Format duration to MM:SS
+        d_sec = metrics.pop('duration_seconds')
+        known = d_sec.notna()
+        # Whole seconds split once with divmod; same result as int(d // 60), int(d % 60) for d >= 0
+        minutes, seconds = np.divmod(d_sec[known].to_numpy().astype(np.int64), 60)
+        mmss = np.char.add(np.char.add(np.char.zfill(minutes.astype(str), 2), ':'),
+                           np.char.zfill(seconds.astype(str), 2))
+        metrics['duration'] = pd.Series(mmss, index=d_sec.index[known], dtype=object).reindex(metrics.index)
+
+    # Add tags
+    tags = pd.DataFrame.from_records([res.get('tags') or {} for res in results])
+
+    # Columns are already in their final order; join the blocks without copying them
+    return pd.concat([df, metrics, tags], axis=1, copy=False)
+
+
+def _read_dedupe_tags(file_path: Path) -> tuple:
+    """Returns the first (artist, album, title) values of a FLAC file, '' when missing."""
+    return tuple(value or '' for value in read_vorbis_comments(file_path, _DEDUPE_TAG_KEYS))
+
+
+def _dedupe_file_info(file_path: Path) -> tuple:
+    """Returns (artist, album, title, size_mb) for the Duplicates tab, blanks if unreadable."""
+    try:
+        return (*_read_dedupe_tags(file_path), round(file_path.stat().st_size / (1024 * 1024), 2))
+    except Exception:
+        return '', '', '', 0
 
-        data.append(row)
 
-    df = pd.DataFrame(data)
-    return df
+def _write_dedupe_json(fh, rows: list) -> None:
+    """Writes the Duplicates tab rows (lists in _DEDUPE_COLUMNS order) into fh, in slices of _JSON_CHUNK_ROWS."""
+    fh.write('{"columns": ' + json.dumps(_DEDUPE_COLUMNS) + ', "data": [')
+    for start in range(0, len(rows), _JSON_CHUNK_ROWS):
+        chunk = json.dumps(rows[start:start + _JSON_CHUNK_ROWS], ensure_ascii=False)
+        fh.write((', ' if start else '') + _safe_json_for_html(chunk[1:-1]))
+    fh.write(']}')
 
 
 def _safe_json_for_html(json_str: str) -> str:
@@ -61,6 +130,45 @@ def _safe_json_for_html(json_str: str) -> str:
     return json_str.replace('</', r'<\/')
 
 
+def _iter_split_json(df: pd.DataFrame) -> Iterator[str]:
+    """
+    Yields df as ``to_json(orient='split', index=False)`` would write it, piece by piece.
+
+    'split' lists the column names once and each row as a bare value array,
+    instead of repeating every key in every row as 'records' does. Rows are
+    serialized in slices of _JSON_CHUNK_ROWS so the full payload never exists
+    as a single string.
+    """
+    columns = json.dumps(list(df.columns), ensure_ascii=False, separators=(',', ':'))
+    yield '{"columns":' + columns + ',"data":['
+    for start in range(0, len(df), _JSON_CHUNK_ROWS):
+        chunk = df.iloc[start:start + _JSON_CHUNK_ROWS].to_json(orient='values', force_ascii=False)
+        yield (',' if start else '') + chunk[1:-1]
+    yield ']}'
+
+
+def _write_split_json(fh, df: pd.DataFrame, compress: bool = False) -> None:
+    """
+    Writes df's 'split' JSON straight into fh, optionally gzipped and base64-encoded.
+
+    The compressed form is inflated by the page with DecompressionStream; base64
+    is emitted in whole 3-byte groups so the pieces concatenate into one string.
+    """
+    if not compress:
+        for piece in _iter_split_json(df):
+            fh.write(_safe_json_for_html(piece))
+        return
+
+    compressor = zlib.compressobj(wbits=31)  # gzip container, as DecompressionStream('gzip') expects
+    pending = b''
+    for piece in _iter_split_json(df):
+        pending += compressor.compress(piece.encode('utf-8'))
+        cut = len(pending) - len(pending) % 3
+        fh.write(base64.b64encode(pending[:cut]).decode('ascii'))
+        pending = pending[cut:]
+    fh.write(base64.b64encode(pending + compressor.flush()).decode('ascii'))
+
+
 def save_report_data(
     results: List[Dict[str, Any]],
     output_path: Path,
@@ -374,7 +482,7 @@ h1{flex:0 0 auto;font-size:18px;margin:0 0 15px 0;color:#2c3e50;font-weight:600}
 <div id="toast" class="toast">Copied!</div>
 
 <!-- Data payloads (parsed by JS, never rendered as HTML) -->
-<script id="table-data" type="application/json">%%TABLE_DATA%%</script>
+<script id="table-data" type="application/json" data-encoding="%%TABLE_ENCODING%%">%%TABLE_DATA%%</script>
 <script id="dedupe-data" type="application/json">%%DEDUPE_DATA%%</script>
 
 <script>
@@ -384,16 +492,59 @@ h1{flex:0 0 auto;font-size:18px;margin:0 0 15px 0;color:#2c3e50;font-weight:600}
 // ====== Data ======
 var tableData = [];
 var DEDUPE_DATA = [];
-try {
-    tableData  = JSON.parse(document.getElementById("table-data").textContent  || "[]");
-    DEDUPE_DATA = JSON.parse(document.getElementById("dedupe-data").textContent || "[]");
-} catch(e) {
+// Large tables are shipped gzipped and base64-encoded (data-encoding="gzip-base64")
+// and inflated with DecompressionStream; small ones are plain JSON.
+// Any failure (malformed payload, missing DecompressionStream) rejects the returned promise
+function readJsonPayload(el) {
+    return new Promise(function(resolve) {
+        if (el.getAttribute("data-encoding") !== "gzip-base64") {
+            resolve(JSON.parse(el.textContent || "null"));
+            return;
+        }
+        if (typeof DecompressionStream === "undefined") {
+            throw new Error("this browser cannot decompress the report data (DecompressionStream is not supported)");
+        }
+        var bin = atob(el.textContent.trim()), bytes = new Uint8Array(bin.length);
+        for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+        resolve(new Response(stream).text().then(JSON.parse));
+    });
+}
+
+// Rows are shipped as arrays with the column names listed once; rebuild row objects here,
+// turning the nulls pandas writes for missing values into empty strings
+function rowsFromSplit(split) {
+    var cols = split.columns, nCols = cols.length;
+    return split.data.map(function(values) {
+        var row = {};
+        for (var i = 0; i < nCols; i++) row[cols[i]] = values[i] === null ? "" : values[i];
+        return row;
+    });
+}
+
+// Set when the table payload cannot be read; initialization then reports it instead of an empty table
+var dataError = null;
+var dataReady = readJsonPayload(document.getElementById("table-data")).then(function(tableSplit) {
+    tableData = rowsFromSplit(tableSplit || {columns: [], data: []});
+    tableData.forEach(function(row){ row._search = searchBlob(Object.values(row)); });
+}, function(e) {
     console.error("Failed to parse report data:", e);
+    dataError = e;
+});
+// The Duplicates tab payload is only parsed when the tab is first opened
+function loadDedupeData() {
+    try {
+        DEDUPE_DATA = rowsFromSplit(JSON.parse(document.getElementById("dedupe-data").textContent || '{"columns":[],"data":[]}'));
+    } catch(e) {
+        console.error("Failed to parse report data:", e);
+    }
 }
 
 var HAS_DUPES_TAB = %%HAS_DUPES_TAB%%;
 var DEDUPE_STATS  = {groups: %%DEDUPE_GROUPS%%, files: %%DEDUPE_FILES%%, strict: %%DEDUPE_STRICT%%};
 var GROUP_COLORS  = ["#e3f2fd","#f1f8e9","#fff3e0"];
+// Small tables are rendered in full up front; the virtual DOM only pays off for large ones
+var BASIC_RENDER_MAX_ROWS = 1000;
 var currentReportData = null;
 var table = null;
 var dedupeTable = null;
@@ -405,23 +556,18 @@ var BLOCK_TYPES = {0:"STREAMINFO",1:"PADDING",2:"APPLICATION",3:"SEEKTABLE",
 
 // ====== Utilities ======
 
+// One lookup table and a single regex pass per string (instead of one pass per character)
+var HTML_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#039;"};
+function escapeChar(c) { return HTML_ESCAPES[c]; }
+
 function escapeHtml(text) {
     if (!text) return "";
-    return String(text)
-        .replace(/&/g, "&amp;")
-        .replace(/</g, "&lt;")
-        .replace(/>/g, "&gt;")
-        .replace(/"/g, "&quot;")
-        .replace(/'/g, "&#039;");
+    return String(text).replace(/[&<>"']/g, escapeChar);
 }
 
+/** Attribute values get the same escaping as text (both quote styles, like Python's html.escape). */
 function escapeAttr(text) {
-    if (!text) return "";
-    return String(text)
-        .replace(/&/g, "&amp;")
-        .replace(/"/g, "&quot;")
-        .replace(/</g, "&lt;")
-        .replace(/>/g, "&gt;");
+    return escapeHtml(text);
 }
 
 function showToast(msg) {
@@ -435,6 +581,25 @@ function copyToClipboard(text, msg) {
     navigator.clipboard.writeText(text).then(function(){ showToast(msg || "Copied!"); });
 }
 
+// Each row carries its values lowercased and joined once (on a separator nobody types),
+// so a keystroke costs one includes() per row instead of a lowercase per cell
+var SEARCH_DEBOUNCE_MS = 100;
+function searchBlob(values) {
+    return values.map(function(v){ return String(v).toLowerCase(); }).join("\x1f");
+}
+
+function bindSearch(input, tbl) {
+    var timer = null;
+    input.addEventListener("input", function(e) {
+        var val = e.target.value.toLowerCase();
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+            if (!val) { tbl.clearFilter(); return; }
+            tbl.setFilter(function(data){ return data._search.includes(val); });
+        }, SEARCH_DEBOUNCE_MS);
+    });
+}
+
 function getAudioQuality(sr, bps) {
     if (sr >= 192000) return {label:"Hi-Res 192kHz", cls:"quality-hires"};
     if (sr >= 96000)  return {label:"Hi-Res 96kHz",  cls:"quality-hires"};
@@ -708,11 +873,19 @@ function copyReport(format) {
 
 // ====== Formatters ======
 
+// Badge markup is constant per value, so it is built once rather than per cell
+var STATUS_BADGES = {
+    "VALID":   '<span class="status-badge status-valid">Valid</span>',
+    "INVALID": '<span class="status-badge status-invalid">Invalid</span>'
+};
+var STATUS_BADGE_DEFAULT = '<span class="status-badge status-warning">Warning</span>';
+var DUPE_TYPE_BADGES = {
+    "Strict":     '<span class="status-badge status-invalid">Strict</span>',
+    "Audio-Only": '<span class="status-badge status-warning">Audio-Only</span>'
+};
+
 function statusFormatter(cell) {
-    var v = cell.getValue();
-    if (v === "VALID")   return '<span class="status-badge status-valid">Valid</span>';
-    if (v === "INVALID") return '<span class="status-badge status-invalid">Invalid</span>';
-    return '<span class="status-badge status-warning">Warning</span>';
+    return STATUS_BADGES[cell.getValue()] || STATUS_BADGE_DEFAULT;
 }
 
 function fileFormatter(cell) {
@@ -749,6 +922,17 @@ function calcDedupeHeight() {
 // ====== Initialization ======
 
 document.addEventListener("DOMContentLoaded", function() {
+    dataReady.then(function() {
+        if (dataError) {
+            document.getElementById("table-container").innerHTML =
+                '<div style="padding:20px;color:#e03131">Failed to load report data: ' + escapeHtml(dataError.message) + "</div>";
+            return;
+        }
+        initPage();
+    });
+});
+
+function initPage() {
     // Verify Tabulator loaded
     if (typeof Tabulator === "undefined") {
         document.getElementById("table-container").innerHTML =
@@ -762,6 +946,7 @@ document.addEventListener("DOMContentLoaded", function() {
     try {
         table = new Tabulator("#table-container", {
             data: tableData,
+            renderVertical: tableData.length < BASIC_RENDER_MAX_ROWS ? "basic" : "virtual",
             height: calcTableHeight() + "px",
             layout: "fitDataStretch",
             placeholder: "No matching records found",
@@ -802,13 +987,7 @@ document.addEventListener("DOMContentLoaded", function() {
     }
 
     // Global search
-    document.getElementById("search-input").addEventListener("input", function(e) {
-        var val = e.target.value.toLowerCase();
-        if (!val) { table.clearFilter(); return; }
-        table.setFilter(function(data) {
-            return Object.values(data).some(function(v){ return String(v).toLowerCase().includes(val); });
-        });
-    });
+    bindSearch(document.getElementById("search-input"), table);
 
     // Status filter buttons
     document.querySelectorAll(".filter-btn").forEach(function(btn) {
@@ -869,7 +1048,7 @@ document.addEventListener("DOMContentLoaded", function() {
             btn.addEventListener("click", function(){ switchTab(this.dataset.tab); });
         });
     }
-});
+}
 
 // ====== Tab Switching ======
 
@@ -892,16 +1071,19 @@ function switchTab(tab) {
 // ====== Dedupe Table ======
 
 function initDedupeTable() {
+    loadDedupeData();
     if (!DEDUPE_DATA.length) {
         document.getElementById("dedupe-table").innerHTML =
             '<p style="color:#868e96;padding:20px 0">No audio duplicates found in this scan.</p>';
         return;
     }
     if (typeof Tabulator === "undefined") return;
+    DEDUPE_DATA.forEach(function(row){ row._search = searchBlob(Object.values(row)); });
 
     try {
         dedupeTable = new Tabulator("#dedupe-table", {
             data: DEDUPE_DATA,
+            renderVertical: DEDUPE_DATA.length < BASIC_RENDER_MAX_ROWS ? "basic" : "virtual",
             layout: "fitDataStretch",
             height: calcDedupeHeight() + "px",
             placeholder: "No duplicates found",
@@ -925,8 +1107,7 @@ function initDedupeTable() {
                            '<span title="' + escapeAttr(d.folder) + '">' + escapeHtml(d.foldername) + "</span></div>";
                 }},
                 {title: "Type", field: "type", width: 104, hozAlign: "center", formatter: function(cell) {
-                    var v = cell.getValue();
-                    return '<span class="status-badge ' + (v === "Strict" ? "status-invalid" : "status-warning") + '">' + escapeHtml(v) + "</span>";
+                    return DUPE_TYPE_BADGES[cell.getValue()] || "";
                 }},
                 {title: "Audio MD5", field: "md5", width: 155, formatter: function(cell) {
                     var v = cell.getValue() || "";
@@ -941,13 +1122,7 @@ function initDedupeTable() {
             initialSort: [{column: "group", dir: "asc"}]
         });
 
-        document.getElementById("dedupe-search").addEventListener("input", function() {
-            var val = this.value.toLowerCase();
-            if (!val) { dedupeTable.clearFilter(); return; }
-            dedupeTable.setFilter(function(data) {
-                return Object.values(data).some(function(v){ return String(v).toLowerCase().includes(val); });
-            });
-        });
+        bindSearch(document.getElementById("dedupe-search"), dedupeTable);
     } catch(e) {
         console.error("Dedupe Tabulator Init Error:", e);
     }
@@ -958,6 +1133,9 @@ function initDedupeTable() {
 </body>
 </html>"""
 
+# Split once at import: even items are literal fragments, odd items marker names
+_HTML_PARTS = re.split(r'%%([A-Z_]+)%%', _HTML_TEMPLATE)
+
 
 def generate_html_report(df: pd.DataFrame, output_path: Path, duplicate_groups=None):
     """
@@ -973,12 +1151,6 @@ def generate_html_report(df: pd.DataFrame, output_path: Path, duplicate_groups=N
         logging.warning("DataFrame is empty, cannot generate HTML report.")
         return
 
-    # --- Data preparation ------------------------------------------------
-    df_clean = df.fillna('')
-    data_json = _safe_json_for_html(
-        df_clean.to_json(orient='records', force_ascii=False)
-    )
-
     # --- Dedupe tab data -------------------------------------------------
     has_dupes_tab = duplicate_groups is not None
     dedupe_rows: list = []
@@ -987,69 +1159,79 @@ def generate_html_report(df: pd.DataFrame, output_path: Path, duplicate_groups=N
     dedupe_strict_sets  = 0
 
     if has_dupes_tab and duplicate_groups:
-        from mutagen.flac import FLAC
+        dedupe_total_files = sum(len(g.files) for g in duplicate_groups)
+        dedupe_rows = [None] * dedupe_total_files
+        # Tag reads are I/O-bound: overlap them in threads, collected in file order before the pool shuts down
+        with ThreadPoolExecutor(max_workers=DEDUPE_TAG_READ_THREADS) as executor:
+            file_infos = list(executor.map(_dedupe_file_info, (f for g in duplicate_groups for f in g.files)))
+        folder_info: Dict[str, tuple] = {}  # folder -> (name, file:// URI), shared by its files
+        row_idx = 0
         for group_idx, grp in enumerate(duplicate_groups, 1):
+            strict_files = {f for sg in grp.strict_groups for f in sg}
             for f in grp.files:
-                is_strict = any(f in sg for sg in grp.strict_groups)
-                try:
-                    audio   = FLAC(f)
-                    artist  = (audio.get('artist') or [''])[0]
-                    album   = (audio.get('album')  or [''])[0]
-                    title   = (audio.get('title')  or [''])[0]
-                    size_mb = round(f.stat().st_size / (1024 * 1024), 2)
-                except Exception:
-                    artist = album = title = ""
-                    size_mb = 0
-                dedupe_rows.append({
-                    "group":      group_idx,
-                    "filename":   f.name,
-                    "filepath":   str(f),
-                    "folder":     str(f.parent),
-                    "foldername": f.parent.name,
-                    "folderuri":  f.parent.as_uri(),
-                    "type":       "Strict" if is_strict else "Audio-Only",
-                    "md5":        grp.audio_md5,
-                    "artist":     artist,
-                    "album":      album,
-                    "title":      title,
-                    "size":       size_mb,
-                })
+                # Plain string splitting; pathlib is only needed for the file:// URI
+                file_str = str(f)
+                folder_str, filename = os.path.split(file_str)
+                folder_name, folder_uri = folder_info.get(folder_str) or folder_info.setdefault(
+                    folder_str, (os.path.basename(folder_str), Path(folder_str).as_uri())
+                )
+                artist, album, title, size_mb = file_infos[row_idx]
+                # Values in _DEDUPE_COLUMNS order
+                dedupe_rows[row_idx] = [
+                    group_idx,
+                    filename,
+                    file_str,
+                    folder_str,
+                    folder_name,
+                    folder_uri,
+                    "Strict" if f in strict_files else "Audio-Only",
+                    grp.audio_md5,
+                    artist,
+                    album,
+                    title,
+                    size_mb,
+                ]
+                row_idx += 1
         dedupe_total_groups = len(duplicate_groups)
-        dedupe_total_files  = sum(len(g.files) for g in duplicate_groups)
         dedupe_strict_sets  = sum(len(g.strict_groups) for g in duplicate_groups)
 
-    dedupe_data_json = _safe_json_for_html(
-        json.dumps(dedupe_rows, ensure_ascii=False)
-    )
-
     # --- Summary stats ---------------------------------------------------
     total_files   = len(df)
     total_size_gb = df['filesize_mb'].sum() / 1024 if 'filesize_mb' in df.columns else 0
-    invalid_count = len(df[df['status'] == 'INVALID'])
-    warning_count = len(df[df['status'] == 'VALID (with warnings)'])
-    valid_count   = len(df[df['status'] == 'VALID'])
-
-    # --- Build HTML via placeholder substitution -------------------------
-    # Replace scalar placeholders first (they cannot contain %%...%% markers),
-    # then data payloads last (which could theoretically contain marker-like text).
-    html = _HTML_TEMPLATE
-    html = html.replace('%%TOTAL_FILES%%',   f'{total_files:,}')
-    html = html.replace('%%TOTAL_SIZE_GB%%', f'{total_size_gb:.2f}')
-    html = html.replace('%%VALID_COUNT%%',   f'{valid_count:,}')
-    html = html.replace('%%WARNING_COUNT%%', f'{warning_count:,}')
-    html = html.replace('%%INVALID_COUNT%%', f'{invalid_count:,}')
-    html = html.replace('%%HAS_DUPES_TAB%%', 'true' if has_dupes_tab else 'false')
-    html = html.replace('%%DEDUPE_GROUPS%%', str(dedupe_total_groups))
-    html = html.replace('%%DEDUPE_FILES%%',  str(dedupe_total_files))
-    html = html.replace('%%DEDUPE_STRICT%%', str(dedupe_strict_sets))
-    # Data payloads last
-    html = html.replace('%%TABLE_DATA%%',    data_json)
-    html = html.replace('%%DEDUPE_DATA%%',   dedupe_data_json)
+    status_counts = df['status'].value_counts()
+    invalid_count = int(status_counts.get('INVALID', 0))
+    warning_count = int(status_counts.get('VALID (with warnings)', 0))
+    valid_count   = int(status_counts.get('VALID', 0))
+
+    # --- Fill the pre-split template -------------------------------------
+    # Scalars are looked up by marker name; the data payloads are written
+    # straight to the file between the template fragments.
+    compress_table = len(df) >= _GZIP_MIN_ROWS
+    scalars = {
+        'TABLE_ENCODING': 'gzip-base64' if compress_table else 'json',
+        'TOTAL_FILES':   f'{total_files:,}',
+        'TOTAL_SIZE_GB': f'{total_size_gb:.2f}',
+        'VALID_COUNT':   f'{valid_count:,}',
+        'WARNING_COUNT': f'{warning_count:,}',
+        'INVALID_COUNT': f'{invalid_count:,}',
+        'HAS_DUPES_TAB': 'true' if has_dupes_tab else 'false',
+        'DEDUPE_GROUPS': str(dedupe_total_groups),
+        'DEDUPE_FILES':  str(dedupe_total_files),
+        'DEDUPE_STRICT': str(dedupe_strict_sets),
+    }
 
     # --- Write -----------------------------------------------------------
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            for i, part in enumerate(_HTML_PARTS):
+                if i % 2 == 0:
+                    f.write(part)  # literal template fragment
+                elif part == 'TABLE_DATA':
+                    _write_split_json(f, df, compress_table)  # missing values become null, mapped to '' by the page
+                elif part == 'DEDUPE_DATA':
+                    _write_dedupe_json(f, dedupe_rows)
+                else:
+                    f.write(scalars[part])
         logging.info(f"HTML report generated: {output_path}")
     except Exception as e:
         logging.error(f"Failed to write HTML report: {e}")
@@ -4,9 +4,20 @@ Duplicate detection helpers used by validate --check-duplicates.
 """
 
 import hashlib
+import mmap
+import os
 from pathlib import Path
 from collections import defaultdict
-from typing import List, Dict, NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, List, Dict, NamedTuple
+
+try:
+    import blake3
+except ImportError:  # optional: pip install flac_toolkit[fast]
+    blake3 = None
+
+# Bytes compared at each end of a file before hashing it in full
+_PROBE_SIZE = 4096
 
 
 class DuplicateGroup(NamedTuple):
@@ -16,35 +27,103 @@ class DuplicateGroup(NamedTuple):
 
 
 def get_file_content_hash(path: Path) -> str:
-    """Return the SHA-256 hex digest of a file (used to identify strict duplicates)."""
-    h = hashlib.sha256()
+    """
+    Return a content hex digest of a file (used to identify strict duplicates).
+
+    Digests are only compared with each other within one run, so the algorithm
+    is free to change: BLAKE3 (multi-threaded) when the blake3 package is
+    installed, SHA-256 otherwise. Either way the file is memory-mapped and
+    hashed in a single call; files that cannot be mapped (empty, or too large
+    for a 32-bit address space) are read in chunks instead.
+    """
+    if blake3 is not None:
+        h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        h.update_mmap(path)
+        return h.hexdigest()
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                return hashlib.sha256(mm).hexdigest()
+        except (OSError, ValueError, OverflowError):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _probe_key(path: Path) -> tuple:
+    """Return (size, first bytes, last bytes): files that differ here cannot be identical."""
     with open(path, "rb") as f:
-        for block in iter(lambda: f.read(65536), b""):
-            h.update(block)
-    return h.hexdigest()
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(_PROBE_SIZE)
+        if size <= 2 * _PROBE_SIZE:
+            return size, head, b""
+        f.seek(-_PROBE_SIZE, os.SEEK_END)
+        return size, head, f.read()
 
 
-def build_duplicate_groups(audio_md5_map: Dict[str, List[Path]]) -> List[DuplicateGroup]:
+def _colliding(paths: List[Path], key: Callable[[Path], Hashable]) -> List[List[Path]]:
+    """Bucket paths by key, keeping only buckets of two or more (in first-seen order)."""
+    buckets: Dict[Hashable, List[Path]] = defaultdict(list)
+    for p in paths:
+        buckets[key(p)].append(p)
+    return [b for b in buckets.values() if len(b) > 1]
+
+
+def _find_strict_groups(
+    file_group: List[Path], probe_buckets: List[List[Path]], digests: Dict[Path, str]
+) -> List[List[Path]]:
+    """Split the probe buckets of file_group by full content digest, in file_group order."""
+    strict_groups = []
+    for candidates in probe_buckets:
+        strict_groups.extend(_colliding(candidates, digests.__getitem__))
+    order = {f: i for i, f in enumerate(file_group)}
+    strict_groups.sort(key=lambda g: order[g[0]])
+    return strict_groups
+
+
+def build_duplicate_groups(
+    audio_md5_map: Dict[str, List[Path]], workers: int | None = None
+) -> List[DuplicateGroup]:
     """
     Build DuplicateGroup list from a pre-computed {audio_md5: [paths]} mapping.
 
     Only groups with two or more files are kept. Within each group, a secondary
-    SHA-256 pass identifies files that are byte-for-byte identical (strict duplicates).
+    content pass identifies files that are byte-for-byte identical (strict duplicates):
+    files are first bucketed by size and by their first and last _PROBE_SIZE bytes,
+    and only files still colliding after that are hashed in full, largest first,
+    on `workers` threads (hashing releases the GIL).
 
     This is called by validate --check-duplicates, which passes the md5_calculated
     values already computed during RFC 9639 validation -- no extra audio I/O required.
     """
-    groups = []
-    for audio_md5, file_group in audio_md5_map.items():
-        if len(file_group) < 2:
-            continue
-        content_map: Dict[str, List[Path]] = defaultdict(list)
-        for f in file_group:
-            content_map[get_file_content_hash(f)].append(f)
-        strict_groups = [g for g in content_map.values() if len(g) > 1]
-        groups.append(DuplicateGroup(
+    sizes: Dict[Path, int] = {}
+
+    def probe(path: Path) -> tuple:
+        key = _probe_key(path)
+        sizes[path] = key[0]
+        return key
+
+    probe_buckets = {
+        audio_md5: _colliding(file_group, probe)
+        for audio_md5, file_group in audio_md5_map.items()
+        if len(file_group) >= 2
+    }
+    # Largest files first, so the long hashes start early and the threads finish together
+    to_hash = sorted(
+        dict.fromkeys(f for buckets in probe_buckets.values() for b in buckets for f in b),
+        key=sizes.__getitem__, reverse=True,
+    )
+    # -w 0 or a negative count would make ThreadPoolExecutor raise after the scan is done
+    if workers is not None:
+        workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = dict(zip(to_hash, executor.map(get_file_content_hash, to_hash)))
+
+    return [
+        DuplicateGroup(
             audio_md5=audio_md5,
-            files=file_group,
-            strict_groups=strict_groups,
-        ))
-    return groups
+            files=audio_md5_map[audio_md5],
+            strict_groups=_find_strict_groups(audio_md5_map[audio_md5], buckets, digests),
+        )
+        for audio_md5, buckets in probe_buckets.items()
+    ]
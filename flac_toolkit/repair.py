@@ -1,3 +1,6 @@
+import errno
+import functools
+import os
 import re
 import shutil
 import subprocess
@@ -9,7 +12,7 @@ from mutagen.flac import FLAC
 from unidecode import unidecode
 from pathvalidate import sanitize_filename
 
-from flac_toolkit.constants import QUARANTINE_FOLDER_NAME
+from flac_toolkit.constants import FILENAME_CACHE_SIZE, QUARANTINE_FOLDER_NAME, TAG_PADDING
 
 
 def repair_worker(file_path: Path, force: bool, no_backup: bool):
@@ -34,10 +37,15 @@ def repair_worker(file_path: Path, force: bool, no_backup: bool):
 
 
 
+@functools.lru_cache(maxsize=FILENAME_CACHE_SIZE)
+def _canonicalize(name: str) -> str:
+    """Transliterate name to ASCII and make it valid on every platform (pure, so memoized)."""
+    return sanitize_filename(unidecode(name), platform="universal")
+
+
 def repair_filename(file_path: Path) -> Path:
     original_name = file_path.name
-    repaired_name = unidecode(original_name)
-    repaired_name = sanitize_filename(repaired_name, platform="universal")
+    repaired_name = _canonicalize(original_name)
 
     if repaired_name != original_name:
         new_path = file_path.with_name(repaired_name)
@@ -49,6 +57,16 @@ def repair_filename(file_path: Path) -> Path:
             logging.error(f"[red]✗[/red] Rename error: {e}")
     return file_path
 
+
+@functools.lru_cache(maxsize=None)
+def _encoder() -> str | None:
+    """Returns the re-encoding tool to use ('flac', else 'ffmpeg'), looked up on PATH once per process."""
+    for tool in ('flac', 'ffmpeg'):
+        if shutil.which(tool):
+            return tool
+    return None
+
+
 def reencode_flac(input_path: Path, no_backup: bool = False) -> Path | None:
     # Use a short temporary filename in the same directory to avoid path length limits
     # This is especially important on Windows where MAX_PATH is 260 characters
@@ -58,25 +76,29 @@ def reencode_flac(input_path: Path, no_backup: bool = False) -> Path | None:
     last_error = ""
 
     try:
-        if shutil.which('flac'):
-            cmd = ['flac', '--best', '--verify', '--force', '-o', str(temp_output_path), str(input_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        encoder = _encoder()
+        if encoder == 'flac':
+            # -s: no per-file progress statistics on stderr, only errors are left to capture
+            cmd = ['flac', '-s', '--best', '--verify', '--force', '-o', str(temp_output_path), str(input_path)]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             if result.returncode == 0:
                 logging.debug(f"[green]✓[/green] Re-encoded ([bold]flac[/bold]): [cyan]{input_path.name}[/cyan]")
                 success = True
             else:
-                last_error = result.stderr.strip()
+                last_error = result.stderr.decode('utf-8', errors='ignore').strip()
                 logging.error(f"[red]✗[/red] Re-encode failed ([bold]flac[/bold]): {last_error}")
-        elif shutil.which('ffmpeg'):
+        elif encoder == 'ffmpeg':
             logging.debug("→ Attempting with [bold]ffmpeg[/bold]...")
             # Use maximum compression settings equivalent to flac --best (level 8)
-            cmd = ['ffmpeg', '-i', str(input_path), '-acodec', 'flac', '-compression_level', '12', '-y', str(temp_output_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+            # -nostdin: concurrent repair workers must not compete for the terminal's keyboard input
+            # -hide_banner -loglevel error: keep only error messages on stderr (no banner or progress)
+            cmd = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', str(input_path), '-map_metadata', '0', '-acodec', 'flac', '-compression_level', '12', '-y', str(temp_output_path)]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
             if result.returncode == 0:
                 logging.debug(f"[green]✓[/green] Re-encoded ([bold]ffmpeg[/bold]): [cyan]{input_path.name}[/cyan]")
                 success = True
             else:
-                last_error = result.stderr.strip()
+                last_error = result.stderr.decode('utf-8', errors='ignore').strip()
                 logging.error(f"[red]✗[/red] Re-encode failed ([bold]ffmpeg[/bold]): {last_error}")
         
         if not success:
@@ -113,24 +135,19 @@ def reencode_flac(input_path: Path, no_backup: bool = False) -> Path | None:
         _copy_metadata(input_path, temp_output_path)
         
         if no_backup:
-            # Delete original file directly (no backup)
-            try:
-                input_path.unlink()
-                logging.debug(f"  [green]✓[/green] Deleted original (no-backup mode): [cyan]{input_path.name}[/cyan]")
-            except OSError as e:
-                logging.warning(f"  [yellow]⚠[/yellow] Failed to delete original: {e}")
+            # Overwrite the original in one atomic step (no backup)
             try:
-                temp_output_path.rename(input_path)
-                logging.debug(f"  [green]✓[/green] Renamed repaired file to original name: [cyan]{input_path.name}[/cyan]")
+                _replace_file(temp_output_path, input_path)
+                logging.debug(f"  [green]✓[/green] Replaced original with repaired file (no-backup mode): [cyan]{input_path.name}[/cyan]")
                 return input_path
             except OSError as e:
-                logging.error(f"  [red]✗[/red] Failed to rename repaired file to original name: {e}")
+                logging.error(f"  [red]✗[/red] Failed to replace original with repaired file: {e}")
                 return temp_output_path
         else:
             # Default behavior: quarantine original
             if _quarantine_original(input_path):
                 try:
-                    temp_output_path.rename(input_path)
+                    _replace_file(temp_output_path, input_path)
                     logging.debug(f"  [green]✓[/green] Renamed repaired file to original name: [cyan]{input_path.name}[/cyan]")
                     return input_path
                 except OSError as e:
@@ -151,22 +168,42 @@ def _quarantine_original(file_path: Path) -> bool:
     try:
         quarantine_dir = file_path.parent / QUARANTINE_FOLDER_NAME
         quarantine_dir.mkdir(exist_ok=True)
-        destination = quarantine_dir / file_path.name
-        
-        if destination.exists():
-            destination.unlink()
-            
-        shutil.move(str(file_path), str(destination))
+        # Overwrites any older copy; the quarantine folder may be a link to another filesystem
+        _replace_file(file_path, quarantine_dir / file_path.name)
         logging.debug(f"  [green]✓[/green] Moved original to quarantine: [bold]{QUARANTINE_FOLDER_NAME}[/bold]/[cyan]{file_path.name}[/cyan]")
         return True
     except Exception as e:
         logging.warning(f"  [yellow]⚠[/yellow] Failed to move original to quarantine: {e}")
         return False
 
+
+def _replace_file(source: Path, destination: Path) -> None:
+    """
+    Moves source to destination, overwriting it: an atomic os.replace when both
+    are on the same filesystem, else (EXDEV, e.g. a quarantine folder that is a
+    symlink or mount point) a copy-and-delete through shutil.move.
+    """
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(source), str(destination))
+
+def _tag_padding(info) -> int:
+    """mutagen padding policy: keep tag edits in place whenever they fit, else leave TAG_PADDING bytes of room."""
+    return info.padding if info.padding >= 0 else TAG_PADDING
+
+
 def _copy_metadata(source: Path, dest: Path):
     try:
         original = FLAC(source); repaired = FLAC(dest)
-        repaired.clear(); repaired.update(original); repaired.save()
+        original_tags = dict(original.items())
+        if dict(repaired.items()) == original_tags:
+            # The encoder carried the tags over (flac does for FLAC input): nothing to rewrite
+            logging.debug("  [green]✓[/green] Metadata already carried over by the encoder.")
+            return
+        repaired.clear(); repaired.update(original_tags); repaired.save(padding=_tag_padding)
         logging.debug("  [green]✓[/green] Copied metadata.")
     except Exception as e:
         logging.warning(f"  [yellow]⚠[/yellow] Failed to copy metadata: {e}")
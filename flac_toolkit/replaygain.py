@@ -1,76 +1,193 @@
 import logging
 import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 import numpy as np
-import pyloudnorm as pyln
+import scipy.signal
 import soundfile as sf
 from mutagen.flac import FLAC
 
-from flac_toolkit.constants import TARGET_LOUDNESS_LUFS
-from flac_toolkit.core import flac_progress
+from flac_toolkit.constants import REPLAYGAIN_READ_FRAMES, TAG_WRITE_THREADS, TARGET_LOUDNESS_LUFS
+from flac_toolkit.core import read_vorbis_comments, run_parallel
 
 
+def read_album_tag(file_path: Path) -> str | None:
+    """Returns the first ALBUM value of a FLAC file, or None if it has no album tag."""
+    return read_vorbis_comments(file_path, ('album',))[0]
 
-def _normalize_audio_data(data: np.ndarray) -> np.ndarray:
-    """Converts audio data to 32-bit float, handling integers."""
-    original_dtype = data.dtype
-    if np.issubdtype(original_dtype, np.integer):
-        max_val = np.iinfo(original_dtype).max
-        return data.astype(np.float32) / max_val
-    elif np.issubdtype(original_dtype, np.floating):
-        return data.astype(np.float32)
-    else:
-        raise TypeError(f"Unsupported audio data type: {original_dtype}")
 
-def _calculate_track_replaygain(file_path: Path) -> Tuple[float, float, np.ndarray] | None:
-    """Calculates loudness, peak, and returns the raw audio data to avoid re-reading."""
-    try:
-        data, rate = sf.read(file_path, always_2d=True)
-        float_data = _normalize_audio_data(data)
+# ITU-R BS.1770 gating: per-channel weights (L, R, C, Ls, Rs) and absolute gate
+_CHANNEL_GAINS = np.array([1.0, 1.0, 1.0, 1.41, 1.41])
+_ABSOLUTE_GATE_LUFS = -70.0
+_RELATIVE_GATE_LU = -10.0
+# Gating blocks: 400 ms long, overlapping by 75 %
+_GATE_BLOCK_SECONDS = 0.4
+_GATE_BLOCK_OVERLAP = 0.75
+
+
+def _k_weighting_sos(rate: int) -> np.ndarray:
+    """
+    Returns the BS.1770 K-weighting filter at `rate` as second-order sections.
+
+    Stage 1 is the +4 dB high shelf at 1500 Hz (Q 1/sqrt(2)) modelling the
+    head, stage 2 the 38 Hz high-pass (Q 0.5, RLB weighting); both biquads are
+    derived for any sample rate with the RBJ Audio EQ Cookbook formulas, as
+    pyloudnorm does (at 48 kHz they agree with the coefficients tabulated in
+    BS.1770 to within 1e-4).
+    """
+    # High shelf, +4 dB at 1500 Hz
+    A = 10 ** (4.0 / 40.0)
+    w0 = 2.0 * np.pi * 1500.0 / rate
+    alpha = np.sin(w0) / (2.0 * (1 / np.sqrt(2)))
+    cos_w0, sqrt_a = np.cos(w0), np.sqrt(A)
+    shelf_b = [A * ((A + 1) + (A - 1) * cos_w0 + 2 * sqrt_a * alpha),
+               -2 * A * ((A - 1) + (A + 1) * cos_w0),
+               A * ((A + 1) + (A - 1) * cos_w0 - 2 * sqrt_a * alpha)]
+    shelf_a = [(A + 1) - (A - 1) * cos_w0 + 2 * sqrt_a * alpha,
+               2 * ((A - 1) - (A + 1) * cos_w0),
+               (A + 1) - (A - 1) * cos_w0 - 2 * sqrt_a * alpha]
+
+    # High-pass at 38 Hz
+    w0 = 2.0 * np.pi * 38.0 / rate
+    alpha = np.sin(w0) / (2.0 * 0.5)
+    cos_w0 = np.cos(w0)
+    highpass_b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+    highpass_a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+
+    return np.array([np.concatenate([b, a]) / a[0]
+                     for b, a in ((shelf_b, shelf_a), (highpass_b, highpass_a))])
+
+
+def _block_energies(file_path: Path) -> Tuple[np.ndarray, np.float32]:
+    """
+    Streams a track and returns the K-weighted mean square of every 400 ms
+    gating block, shape (channels, blocks), with the track's sample peak.
+
+    Filters and block bounds are those of pyloudnorm's Meter.integrated_loudness,
+    so gating these blocks gives the meter's loudness (see
+    tests/test_replaygain.py), without its per-channel filter calls and
+    per-block Python loop. The block arrays are tiny compared
+    to the audio, which lets the album loudness be gated over the blocks of all
+    its tracks without joining the audio itself.
+
+    The audio is decoded REPLAYGAIN_READ_FRAMES at a time: the filter state is
+    carried from one read to the next, and each read's squared samples are
+    summed into the segments between consecutive block bounds, so only one
+    read is ever held in memory.
+    """
+    with sf.SoundFile(file_path) as audio:
+        rate, channels, frames = audio.samplerate, audio.channels, audio.frames
+        if channels > 5:
+            raise ValueError("Audio must have five channels or less.")
+        if frames < _GATE_BLOCK_SECONDS * rate:
+            raise ValueError("Audio must have length greater than the block size.")
+
+        block_size = _GATE_BLOCK_SECONDS
+        step = 1.0 - _GATE_BLOCK_OVERLAP
+        num_blocks = int(np.round((frames / rate - block_size) / (block_size * step))) + 1
+        blocks = np.arange(num_blocks)
+        lower = (block_size * (blocks * step) * rate).astype(np.int64)
+        upper = (block_size * (blocks * step + 1) * rate).astype(np.int64)
+        cuts = np.union1d(lower, upper)
+        cuts = cuts[cuts < frames]
+
+        # Both K-weighting biquads run as one second-order-sections cascade over every channel
+        sos = _k_weighting_sos(rate)
+        state = np.zeros((len(sos), channels, 2))
+        segments = np.zeros((channels, len(cuts)))
+        peak = np.float32(0.0)
+        start = 0
+        for chunk in audio.blocks(blocksize=REPLAYGAIN_READ_FRAMES, dtype='float32', always_2d=True):
+            # max(|x|) without materializing np.abs(chunk)
+            peak = max(peak, chunk.max(), -chunk.min())
+            squared, state = scipy.signal.sosfilt(sos, chunk.T, zi=state)
+            np.square(squared, out=squared)
+
+            end = start + len(chunk)
+            first = np.searchsorted(cuts, start, side='right') - 1
+            last = np.searchsorted(cuts, end)
+            local_cuts = cuts[first:last] - start
+            local_cuts[0] = 0  # the segment open at `start` continues into this chunk
+            segments[:, first:last] += np.add.reduceat(squared, local_cuts, axis=1)
+            start = end
+
+    # reduceat over interleaved (lower, upper) segment indices sums every block
+    # in one call; the odd results (upper -> next lower) are discarded. A last
+    # upper bound past the final cut is dropped, reduceat then sums to the end.
+    bounds = np.searchsorted(cuts, np.column_stack([lower, upper]).ravel())
+    if bounds[-1] >= len(cuts):
+        bounds = bounds[:-1]
+    energies = (1.0 / (block_size * rate)) * np.add.reduceat(segments, bounds, axis=1)[:, ::2]
+    return energies, peak
 
-        meter = pyln.Meter(rate)
-        loudness = meter.integrated_loudness(float_data)
-        peak = np.max(np.abs(float_data))
-        return loudness, peak, data
+
+def _gated_loudness(energies: np.ndarray) -> float:
+    """Integrated loudness (LUFS) of gating blocks, with the BS.1770 absolute and relative gates."""
+    gains = _CHANNEL_GAINS[:energies.shape[0]]
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        block_loudness = -0.691 + 10.0 * np.log10(gains @ energies)
+        above_absolute = block_loudness >= _ABSOLUTE_GATE_LUFS
+        relative_gate = (-0.691 + 10.0 * np.log10(gains @ energies[:, above_absolute].mean(axis=1))
+                         + _RELATIVE_GATE_LU)
+        gated = (block_loudness > relative_gate) & (block_loudness > _ABSOLUTE_GATE_LUFS)
+        mean_energy = np.nan_to_num(energies[:, gated].mean(axis=1))
+        return -0.691 + 10.0 * np.log10(gains @ mean_energy)
+
+
+def _calculate_track_replaygain(file_path: Path) -> Tuple[Path, float, float, np.ndarray] | None:
+    """Calculates loudness and peak, and returns the track's gating block energies for the album gain.
+
+    The path is returned too, since parallel runs complete out of order.
+    """
+    try:
+        energies, peak = _block_energies(file_path)
+        loudness = _gated_loudness(energies)
+        return file_path, loudness, peak, energies
     except Exception as e:
         logging.error(f"✗ Failed to analyze track {file_path.name}: {e}")
         return None
 
-def process_album(album_files: List[Path]):
+def measure_tracks(files: List[Path], workers: int | None = None) -> Dict[Path, Tuple[float, float, np.ndarray]]:
     """
-    Calculates and applies track and album ReplayGain to a list of files.
+    Measures (loudness, peak, gating block energies) for every file, keyed by path.
+
+    All tracks of a run go through a single worker pool (`workers` processes,
+    None = cpu_count, 1 = sequential), whatever album they belong to; files
+    that cannot be analyzed are logged and left out.
+    """
+    results = run_parallel(files, _calculate_track_replaygain, workers, "Calculating ReplayGain...")
+    return {r[0]: r[1:] for r in results if r}
+
+
+def process_album(album_files: List[Path], measurements: Dict[Path, Tuple[float, float, np.ndarray]]):
     """
-    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn, MofNCompleteColumn
+    Calculates and applies track and album ReplayGain to a list of files.
 
+    `measurements` comes from measure_tracks; tracks missing from it (failed
+    analysis) are skipped.
+    """
     track_data = {}
-    all_audio_data = []
-
-    # 1. Calculate track gain for each file
-    with flac_progress("Calculating ReplayGain...") as (progress, desc):
-        task = progress.add_task(desc, total=len(album_files))
-        for file_path in album_files:
-            result = _calculate_track_replaygain(file_path)
-            if result:
-                loudness, peak, audio_data = result
-                track_data[file_path] = (loudness, peak)
-                all_audio_data.append(audio_data)
-            progress.advance(task)
-
-    if not all_audio_data:
+    album_energies = []
+
+    # 1. Collect the track measurements in album order
+    for file_path in album_files:
+        if file_path in measurements:
+            loudness, peak, energies = measurements[file_path]
+            track_data[file_path] = (loudness, peak)
+            album_energies.append(energies)
+
+    if not album_energies:
         logging.warning("✗ No valid tracks found to process for album gain.")
         return
 
     # 2. Calculate album gain
     try:
-        # Normalize each track before concatenating
-        normalized_album_data = [_normalize_audio_data(d) for d in all_audio_data]
-        concatenated_data = np.concatenate(normalized_album_data)
-        
-        rate = sf.info(album_files[0]).samplerate
-        meter = pyln.Meter(rate)
-        album_loudness = meter.integrated_loudness(concatenated_data)
+        # Gate the 400 ms blocks of all tracks together instead of joining the audio
+        album_loudness = _gated_loudness(np.concatenate(album_energies, axis=1))
         album_peak = max(peak for _, peak in track_data.values())
         
         album_gain_db = TARGET_LOUDNESS_LUFS - album_loudness
@@ -81,20 +198,31 @@ def process_album(album_files: List[Path]):
         logging.error(f"✗ Failed to calculate album gain: {e}")
         return
 
-    # 3. Apply all tags
-    for file_path, (loudness, peak) in track_data.items():
-        try:
-            track_gain_db = TARGET_LOUDNESS_LUFS - loudness
-            track_gain_str = f"{track_gain_db:+.2f} dB"
-            track_peak_str = f"{peak:.6f}"
-
-            audio = FLAC(file_path)
-            audio["REPLAYGAIN_TRACK_GAIN"] = track_gain_str
-            audio["REPLAYGAIN_TRACK_PEAK"] = track_peak_str
-            audio["REPLAYGAIN_ALBUM_GAIN"] = album_gain_str
-            audio["REPLAYGAIN_ALBUM_PEAK"] = album_peak_str
-            audio["REPLAYGAIN_REFERENCE_LOUDNESS"] = f"{TARGET_LOUDNESS_LUFS:.2f} dB"
-            audio.save()
-            logging.info(f"  ✓ Tags applied to {file_path.name}")
-        except Exception as e:
-            logging.error(f"✗ Failed to apply tags to {file_path.name}: {e}")
+    # 3. Apply all tags; the writes are I/O-bound, so files are tagged concurrently
+    loudnesses, peaks = zip(*track_data.values())
+    track_gains_db = TARGET_LOUDNESS_LUFS - np.array(loudnesses)  # float64, as album_gain_db
+    with ThreadPoolExecutor(max_workers=TAG_WRITE_THREADS) as executor:
+        futures = []
+        for file_path, track_gain_db, peak in zip(track_data, track_gains_db, peaks):
+            tags = {
+                "REPLAYGAIN_TRACK_GAIN": f"{track_gain_db:+.2f} dB",
+                "REPLAYGAIN_TRACK_PEAK": f"{peak:.6f}",
+                "REPLAYGAIN_ALBUM_GAIN": album_gain_str,
+                "REPLAYGAIN_ALBUM_PEAK": album_peak_str,
+                "REPLAYGAIN_REFERENCE_LOUDNESS": f"{TARGET_LOUDNESS_LUFS:.2f} dB",
+            }
+            futures.append((file_path, executor.submit(_write_tags, file_path, tags)))
+        for file_path, future in futures:
+            try:
+                future.result()
+                logging.info(f"  ✓ Tags applied to {file_path.name}")
+            except Exception as e:
+                logging.error(f"✗ Failed to apply tags to {file_path.name}: {e}")
+
+
+def _write_tags(file_path: Path, tags: Dict[str, str]) -> None:
+    """Sets the given Vorbis comments on a FLAC file with a single save."""
+    audio = FLAC(file_path)
+    for key, value in tags.items():
+        audio[key] = value
+    audio.save()
@@ -5,6 +5,8 @@ Complete RFC 9639 validation for FLAC files.
 Reference: RFC 9639 - Free Lossless Audio Codec (FLAC), IETF, December 2024.
 """
 
+import mmap
+import os
 import struct
 import re
 import hashlib
@@ -14,6 +16,10 @@ from typing import List, Dict, Any, Optional, BinaryIO, Tuple
 from enum import Enum
 
 
+# Metadata block header: is_last (1 bit), block type (7 bits), length (24 bits)
+BLOCK_HEADER = struct.Struct('>I')
+
+
 class Severity(Enum):
     """Severity levels according to RFC 9639."""
     ERROR = "ERROR"        # MUST/MUST NOT violation
@@ -86,6 +92,7 @@ class ValidationResult:
     
     # Info for detailed report
     file_size: int = 0
+    file_mtime_ns: int = 0  # from the same fstat as file_size (MD5 cache key)
     audio_offset: int = 0
     audio_size: int = 0
     
@@ -146,6 +153,9 @@ class RFC9639Validator:
     # Reserved block type
     BLOCK_TYPE_RESERVED = 127
     
+    # SEEKTABLE seek point size: sample number (8) + stream offset (8) + frame samples (2)
+    SEEKPOINT_SIZE = 18
+    
     # Names for block types
     BLOCK_TYPE_NAMES = {
         0: "STREAMINFO",
@@ -186,6 +196,8 @@ class RFC9639Validator:
         self.file_path = Path(file_path)
         self.result = ValidationResult(file_path=self.file_path)
         self._f: Optional[BinaryIO] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._blocks_by_type: Dict[int, List[MetadataBlock]] = {}  # filled in one pass by the header walk
         self._blocking_strategy_fixed: Optional[bool] = None
         self._frame_decoding_errors: bool = False  # Track if we had decoding errors for MD5 validation
         
@@ -216,10 +228,21 @@ class RFC9639Validator:
     def validate(self) -> ValidationResult:
         """Execute ALL RFC 9639 checks."""
         try:
-            self.result.file_size = self.file_path.stat().st_size
             with open(self.file_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                self.result.file_size = st.st_size
+                self.result.file_mtime_ns = st.st_mtime_ns
                 self._f = f
-                self._validate_all()
+                if self.result.file_size == 0:
+                    # mmap cannot map an empty file; plain reads report the EOF errors
+                    self._validate_all()
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        self._mm = mm
+                        try:
+                            self._validate_all()
+                        finally:
+                            self._mm = None
         except FileNotFoundError:
             self._add_error("G-00", "File not found", "§6")
         except PermissionError:
@@ -271,6 +294,10 @@ class RFC9639Validator:
     def _add_info(self, code: str, msg: str, ref: str):
         self.result.infos.append(CheckResult(code, Severity.INFO, msg, ref))
     
+    def _blocks_of(self, block_type: int) -> List[MetadataBlock]:
+        """Metadata blocks of the given type, in file order."""
+        return self._blocks_by_type.get(block_type, [])
+    
     def _read_bytes(self, n: int) -> bytes:
         """Read n bytes from file."""
         return self._f.read(n)
@@ -286,31 +313,39 @@ class RFC9639Validator:
     def _seek(self, pos: int):
         """Seek to position."""
         self._f.seek(pos)
+
+    def _read_at(self, pos: int, n: int) -> bytes:
+        """Read n bytes at absolute offset pos, sliced from the memory map when available."""
+        if self._mm is not None:
+            return self._mm[pos:pos + n]
+        self._seek(pos)
+        return self._read_bytes(n)
     
     # --- Section 1: General Structure ---
     
     def _validate_general_structure(self):
         """Validate general file structure (G-01 to G-08)."""
         # G-01: File starts with 'fLaC' signature
-        signature = self._read_bytes(4)
+        signature = self._read_at(0, 4)
         if signature != self.FLAC_SIGNATURE:
             self._add_error("G-01", f"Invalid signature: expected 'fLaC', got {signature!r}", "§6")
             return
         
-        # Parse all metadata blocks
+        # Parse all metadata blocks straight from the mapped file (no seeks, no read syscalls)
         has_streaminfo = False
         is_last_found = False
+        offset = len(signature)
         
         while True:
-            offset = self._tell()
-            header = self._read_bytes(4)
+            header = self._read_at(offset, 4)
             if len(header) < 4:
                 self._add_error("MH-04", "Unexpected end of file reading metadata block header", "§8.1")
                 break
             
-            is_last = (header[0] & 0x80) != 0
-            block_type = header[0] & 0x7F
-            length = struct.unpack('>I', b'\x00' + header[1:4])[0]
+            fields = BLOCK_HEADER.unpack(header)[0]
+            is_last = (fields >> 31) != 0
+            block_type = (fields >> 24) & 0x7F
+            length = fields & 0xFFFFFF
             
             # MH-01: Block type must be 0-126
             if block_type > 126:
@@ -325,7 +360,7 @@ class RFC9639Validator:
                 self._add_info("MH-03", f"Reserved block type {block_type} found", "§8.1")
             
             # Read block data
-            data = self._read_bytes(length) if length > 0 else b''
+            data = self._read_at(offset + 4, length) if length > 0 else b''
             if len(data) < length:
                 self._add_error("MH-04", f"Metadata block truncated: expected {length} bytes, got {len(data)}", "§8.1")
             
@@ -337,6 +372,7 @@ class RFC9639Validator:
                 data=data
             )
             self.result.metadata_blocks.append(block)
+            self._blocks_by_type.setdefault(block_type, []).append(block)
             
             # Check STREAMINFO position (G-02)
             if block_type == self.BLOCK_STREAMINFO:
@@ -344,10 +380,12 @@ class RFC9639Validator:
                 if len(self.result.metadata_blocks) != 1:
                     self._add_error("G-02", "STREAMINFO must be the first metadata block", "§8.2")
             
+            next_offset = offset + 4 + len(data)
             if is_last:
                 is_last_found = True
-                self.result.audio_offset = self._tell()
+                self.result.audio_offset = next_offset
                 break
+            offset = next_offset
         
         # G-04: Exactly one block must have is_last=1
         last_blocks = [b for b in self.result.metadata_blocks if b.is_last]
@@ -371,7 +409,7 @@ class RFC9639Validator:
     
     def _validate_streaminfo(self):
         """Validate STREAMINFO block (SI-01 to SI-15)."""
-        streaminfo_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_STREAMINFO]
+        streaminfo_blocks = self._blocks_of(self.BLOCK_STREAMINFO)
         
         # SI-01: Exactly one STREAMINFO
         if len(streaminfo_blocks) == 0:
@@ -484,7 +522,7 @@ class RFC9639Validator:
     
     def _validate_padding(self):
         """Validate PADDING blocks (PA-01 to PA-03)."""
-        padding_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_PADDING]
+        padding_blocks = self._blocks_of(self.BLOCK_PADDING)
         
         if len(padding_blocks) > 1:
             self._add_info("PA-03", f"Multiple PADDING blocks found ({len(padding_blocks)})", "§8.3")
@@ -492,14 +530,15 @@ class RFC9639Validator:
         for block in padding_blocks:
             # PA-01: Size is multiple of 8 bits (always true for byte-aligned data)
             # PA-02: All bytes MUST be 0x00 (FIX-05: changed from WARNING to ERROR)
-            if block.data and any(b != 0 for b in block.data):
+            # bytes.count runs in C; a per-byte generator is slow on large padding
+            if block.data.count(0) != len(block.data):
                 self._add_error("PA-02", "PADDING block contains non-zero bytes (MUST be 0x00 per §8.3)", "§8.3")
     
     # --- Section 5: APPLICATION ---
     
     def _validate_application(self):
         """Validate APPLICATION blocks (AP-01 to AP-03)."""
-        app_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_APPLICATION]
+        app_blocks = self._blocks_of(self.BLOCK_APPLICATION)
         
         for block in app_blocks:
             # AP-01: Must have Application ID (32 bits)
@@ -514,7 +553,7 @@ class RFC9639Validator:
     
     def _validate_seektable(self):
         """Validate SEEKTABLE blocks (ST-01 to ST-11)."""
-        seektable_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_SEEKTABLE]
+        seektable_blocks = self._blocks_of(self.BLOCK_SEEKTABLE)
         
         # ST-01: At most one SEEKTABLE
         if len(seektable_blocks) > 1:
@@ -527,16 +566,16 @@ class RFC9639Validator:
         block = seektable_blocks[0]
         
         # ST-02: Size must be multiple of 18 bytes
-        if len(block.data) % 18 != 0:
-            self._add_error("ST-02", f"SEEKTABLE size ({len(block.data)}) is not a multiple of 18", "§8.5")
+        if len(block.data) % self.SEEKPOINT_SIZE != 0:
+            self._add_error("ST-02", f"SEEKTABLE size ({len(block.data)}) is not a multiple of {self.SEEKPOINT_SIZE}", "§8.5")
             return
         
         # Parse seek points
-        num_points = len(block.data) // 18
+        num_points = len(block.data) // self.SEEKPOINT_SIZE
         seek_points = []
         
         for i in range(num_points):
-            offset = i * 18
+            offset = i * self.SEEKPOINT_SIZE
             sample_number = struct.unpack('>Q', block.data[offset:offset+8])[0]
             stream_offset = struct.unpack('>Q', block.data[offset+8:offset+16])[0]
             frame_samples = struct.unpack('>H', block.data[offset+16:offset+18])[0]
@@ -569,7 +608,7 @@ class RFC9639Validator:
     
     def _validate_vorbis_comment(self):
         """Validate VORBIS COMMENT blocks (VC-01 to VC-09)."""
-        vorbis_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_VORBIS_COMMENT]
+        vorbis_blocks = self._blocks_of(self.BLOCK_VORBIS_COMMENT)
         
         # VC-01: At most one VORBIS COMMENT
         if len(vorbis_blocks) > 1:
@@ -660,7 +699,7 @@ class RFC9639Validator:
     
     def _validate_cuesheet(self):
         """Validate CUESHEET blocks (CS-01 to CS-18)."""
-        cuesheet_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_CUESHEET]
+        cuesheet_blocks = self._blocks_of(self.BLOCK_CUESHEET)
         
         for block in cuesheet_blocks:
             data = block.data
@@ -816,7 +855,7 @@ class RFC9639Validator:
     
     def _validate_picture(self):
         """Validate PICTURE blocks (PI-01 to PI-10)."""
-        picture_blocks = [b for b in self.result.metadata_blocks if b.block_type == self.BLOCK_PICTURE]
+        picture_blocks = self._blocks_of(self.BLOCK_PICTURE)
         
         picture_types_found = {}
         
@@ -893,11 +932,8 @@ class RFC9639Validator:
     
     def _validate_uniqueness(self):
         """Validate uniqueness constraints (UN-01 to UN-07)."""
-        # Count block types
-        streaminfo_count = sum(1 for b in self.result.metadata_blocks if b.block_type == self.BLOCK_STREAMINFO)
-        seektable_count = sum(1 for b in self.result.metadata_blocks if b.block_type == self.BLOCK_SEEKTABLE)
-        vorbis_count = sum(1 for b in self.result.metadata_blocks if b.block_type == self.BLOCK_VORBIS_COMMENT)
-        padding_count = sum(1 for b in self.result.metadata_blocks if b.block_type == self.BLOCK_PADDING)
+        # Block counts come from the per-type index built during the header walk
+        padding_count = len(self._blocks_of(self.BLOCK_PADDING))
         
         # Already checked in individual validators, but add consolidated info
         if padding_count > 1:
@@ -958,11 +994,10 @@ class RFC9639Validator:
         if self.result.audio_offset == 0:
             return
 
-        self._seek(self.result.audio_offset)
-        frame_start = self._tell()
+        frame_start = self.result.audio_offset
 
         # Frame header max size: 2 (sync) + 1 + 1 + 7 (coded#) + 2 (extra bs) + 2 (extra sr) + 1 (crc8) = 16
-        raw = self._read_bytes(16)
+        raw = self._read_at(frame_start, 16)
         if len(raw) < 5:
             self._add_error("FH-01", "No valid audio frames found (file truncated at audio offset)", "§9")
             self.result.audio_size = self.result.file_size - self.result.audio_offset
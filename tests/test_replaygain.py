@@ -0,0 +1,76 @@
+"""
+Regression tests for the streamed ReplayGain loudness measurement.
+
+replaygain._block_energies re-implements the K-weighting and gating blocks of
+pyloudnorm's Meter.integrated_loudness; these tests keep the two in agreement.
+"""
+
+import numpy as np
+import pyloudnorm as pyln
+import pytest
+import soundfile as sf
+
+from flac_toolkit import replaygain
+
+# Loudness agreement with pyloudnorm, in LU (the tags are rounded to 0.01 dB)
+TOLERANCE_LU = 1e-6
+
+
+def _write_noise(path, seconds: float, channels: int, rate: int, seed: int = 0) -> np.ndarray:
+    """Writes amplitude-modulated noise as a 24-bit FLAC and returns the samples as decoded."""
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * rate)
+    envelope = np.abs(np.sin(np.arange(frames) / (rate / 2)))[:, None]
+    data = (rng.standard_normal((frames, channels)) * 0.1 * envelope).astype(np.float32)
+    sf.write(path, data, rate, subtype='PCM_24')
+    decoded, _ = sf.read(path, always_2d=True, dtype='float32')
+    return decoded
+
+
+@pytest.mark.parametrize("channels, rate, seconds", [
+    (1, 44100, 3.0),
+    (2, 44100, 20.0),
+    (2, 48000, 7.3),
+    (5, 48000, 5.0),
+    (2, 96000, 3.0),
+    (2, 44100, 0.4),  # exactly one gating block
+])
+def test_track_loudness_matches_pyloudnorm(tmp_path, channels, rate, seconds):
+    path = tmp_path / "track.flac"
+    data = _write_noise(path, seconds, channels, rate)
+
+    energies, peak = replaygain._block_energies(path)
+
+    expected = pyln.Meter(rate).integrated_loudness(data)
+    assert replaygain._gated_loudness(energies) == pytest.approx(expected, abs=TOLERANCE_LU)
+    assert peak == np.max(np.abs(data))
+
+
+@pytest.mark.parametrize("read_frames", [1000, 4410, 1 << 16])
+def test_loudness_does_not_depend_on_read_size(tmp_path, monkeypatch, read_frames):
+    path = tmp_path / "track.flac"
+    data = _write_noise(path, 6.0, 2, 44100, seed=1)
+    monkeypatch.setattr(replaygain, "REPLAYGAIN_READ_FRAMES", read_frames)
+
+    energies, _ = replaygain._block_energies(path)
+
+    expected = pyln.Meter(44100).integrated_loudness(data)
+    assert replaygain._gated_loudness(energies) == pytest.approx(expected, abs=TOLERANCE_LU)
+
+
+def test_silence_is_minus_infinity(tmp_path):
+    path = tmp_path / "silence.flac"
+    sf.write(path, np.zeros((44100 * 2, 2), dtype=np.float32), 44100)
+
+    energies, peak = replaygain._block_energies(path)
+
+    assert replaygain._gated_loudness(energies) == -np.inf
+    assert peak == 0
+
+
+def test_too_short_track_is_rejected(tmp_path):
+    path = tmp_path / "short.flac"
+    sf.write(path, np.zeros((100, 2), dtype=np.float32), 44100)
+
+    with pytest.raises(ValueError):
+        replaygain._block_energies(path)